@@ -1,9 +1,11 @@
-""" A basic two-pass MIPS assembler. Outputs a binary file in a custom format that can then be loaded into Scratch """
+""" A basic one-pass MIPS assembler. Outputs a binary file in a custom format that can then be loaded into Scratch """
 
 import struct
+import sys
 import re
 import json
 import os
+import functools
 
 """
 Diagram of the Scratch MIPS VM memory space
@@ -42,7 +44,7 @@ io {
 
 Scratch executable binary format (the file outputted by Assembly.outputBinaryFile() )
 
-header (100 bytes) {
+header (16 bytes, little endian) {
     char[4] identifier      - set to "SBIN"
 
     uint32 program_counter  - the location in memory to begin execution
@@ -61,13 +63,86 @@ program_data (n bytes) {
 
 """
 
+# Splits a line of assembly source into its parts (see Assembly.parseLine). A line is either a label
+# like "main:", or a name with optional arguments, like ".align 2" or "lui $2,%hi(a)". Arguments can
+# contain strings (which may contain # characters), and anything after a # outside of a string is a comment
+_LINE_RE = re.compile(r"""
+    \s*
+    (?:
+        (?P<label>[^\s#"]+?):+
+    |
+        (?P<dot>\.+)?(?P<name>[^\s#"]+)
+        (?:\s+(?P<args>(?:"[^"]*(?:"|$)|[^"\#\s]|\s+(?=[^\s\#]))*))?
+    )?
+    \s*(?:\#.*)?$
+""", re.VERBOSE)
+
+# Tabs become single spaces before a line is parsed (makes parsing easier). The stored source is left as written
+_TAB_TRANSLATION = str.maketrans("\t", " ")
+
+# Matches one token of an instruction argument (see InstructionArgument._tokenize), along with any
+# whitespace before it. The name of the group that matched is the kind of token
+_ARGUMENT_TOKEN_RE = re.compile(r"""
+    \s*
+    (?:
+        (?P<punctuation>[()+\-*])
+    |
+        \$(?P<reg>\w+)
+    |
+        %(?P<percent>\w+)
+    |
+        (?P<int>\d\w*)
+    |
+        (?P<label>\w+)
+    )
+""", re.VERBOSE)
+
+# Operators that can be applied to a value with the % prefix, like %hi(a)
+# (these are evaluated inline by InstructionArgument._evaluateNode)
+_PERCENT_OPERATORS = frozenset(("lo", "hi"))
+
+# Binary operators allowed in argument expressions
+_BINARY_OPERATORS = {
+    "+": lambda a, b: a+b,
+    "-": lambda a, b: a-b,
+    "*": lambda a, b: a*b
+}
+
+# Packers for 32-bit words; instructions are encoded big endian, data words little endian
+_BE_U32 = struct.Struct(">I")
+_LE_U32 = struct.Struct("<I")
+
+# Binary representation of each byte value followed by a space, as shown in the debug file
+_BYTE_BINARY_STRINGS = tuple("{:08b} ".format(byte) for byte in range(256))
+
+# Binary file header (see header format above)
+_HEADER_STRUCT = struct.Struct("<4sIII")
+
+# Register names (without the $) [name : registerNumber], covering both the mnemonic names
+# and the plain numbers 0-31
+_REGISTER_NUMBERS = {
+    "zero": 0,
+    "gp": 28,
+    "sp": 29,
+    "fp": 30,
+    "ra": 31,
+    **{sys.intern(str(i)): i for i in range(32)}
+}
+
 
 class AssemblyMessage:
+    __slots__ = ("message", "line")
+
     def __init__(self, message, line=None):
         self.message = message
         self.line = line
 
 
+class UndefinedLabelMessage(AssemblyMessage):
+    """ Error for a reference to a label that hasn't been defined (yet, in the case of forward references) """
+    __slots__ = ()
+
+
 class InstructionArgument:
     """
     Class that represents an instruction argument
@@ -89,107 +164,271 @@ class InstructionArgument:
 
     """
 
-    def __init__(self, value):
-        self.value = value
-        self.offset = None
+    __slots__ = ("value", "offset")
 
-    def __radd__(self, offset):
+    def __init__(self, value, offset=None):
+        self.value = value
         self.offset = offset
-        return self
 
     def __repr__(self):
         return f"<Argument value={self.value} offset={self.offset}>"
 
     @staticmethod
     def getRegisterNumber(registerName):
-        """ Find the register number (0-31) from a mnemonic register name like "$fp" """
-
-        assert registerName[0] == "$", Exception(
-            "Register name must start with $")
-        registerName = registerName[1:]
-
-        names = {
-            "zero": 0,
-            "gp": 28,
-            "sp": 29,
-            "fp": 30,
-            "ra": 31
-        }
-
-        if registerName in names:
-            return names[registerName]
-        else:
-            return int(registerName)
+        """ Find the register number (0-31) from a register name like "$fp" or "$31".
+        Raises a KeyError if there isn't a register with that name """
+
+        return _REGISTER_NUMBERS[registerName[1:]]
+
+    @staticmethod
+    def _tokenize(expr):
+        """ Split [expr] into a list of (kind, value) tokens, where kind is one of
+        "int", "label", "reg", "%", or a punctuation character (which is also the value).
+        Raises _ArgumentSyntaxError if something can't be tokenized """
+
+        tokens = []
+        pos = 0
+        length = len(expr)
+
+        while pos < length:
+            match = _ARGUMENT_TOKEN_RE.match(expr, pos)
+
+            if match is None:
+                if expr[pos:].isspace(): # just trailing whitespace left
+                    break
+                raise _ArgumentSyntaxError("Syntax Error")
+
+            pos = match.end()
+            kind = match.lastgroup
+            word = match.group(kind)
+
+            if kind == "punctuation":
+                tokens.append((word, word))
+            elif kind == "reg":
+                try:
+                    tokens.append(("reg", _REGISTER_NUMBERS[word]))
+                except KeyError:
+                    raise _ArgumentSyntaxError(f'Invalid register "${word}"')
+            elif kind == "percent":
+                tokens.append(("%", word))
+            elif kind == "int":
+                try:
+                    tokens.append(("int", int(word, 0)))
+                except ValueError:
+                    raise _ArgumentSyntaxError("Syntax Error")
+            else:
+                tokens.append(("label", word))
+
+        return tokens
+
+    @staticmethod
+    def _parse(expr):
+        """ Parse [expr] into a (registerNumber, node) pair, where either may be None.
+
+        node is an expression tree made of tuples:
+            ("int", value)
+            ("label", name)
+            ("neg", node)
+            ("hi", node)                    # high 16 bits of word
+            ("lo", node)                    # low 16 bits of word
+            ("op", function, left, right)   # function is from _BINARY_OPERATORS
+
+        Parts of the tree that don't reference any labels are folded into a single ("int", value) node.
+
+        Grammar:
+            argument    := REG | expr [ "(" REG ")" ]
+            expr        := term { ("+" | "-") term }
+            term        := unary { "*" unary }
+            unary       := "-" unary | "+" unary | primary
+            primary     := INT | LABEL | "%" NAME "(" expr ")" | "(" expr ")"
+        """
+
+        # lone registers like $sp and constant offset registers like 4($sp) make up most arguments,
+        # and can be picked apart with plain string operations instead of going through the tokenizer
+        if expr[:1] == "$":
+            registerNumber = _REGISTER_NUMBERS.get(expr[1:])
+            if registerNumber is not None:
+                return registerNumber, None
+        elif expr[-1:] == ")":
+            openParen = expr.find("(")
+            if openParen > 0 and expr[openParen+1] == "$":
+                registerNumber = _REGISTER_NUMBERS.get(expr[openParen+2:-1])
+                if registerNumber is not None:
+                    try:
+                        return registerNumber, ("int", int(expr[:openParen], 0))
+                    except ValueError:
+                        pass # not a constant offset (probably a label), so parse it properly
+
+        tokens = InstructionArgument._tokenize(expr)
+        tokens.append((None, None))  # end marker so the parser never has to bounds check
+        pos = 0
+
+        def peek():
+            return tokens[pos][0]
+
+        def take(kind):
+            nonlocal pos
+            token = tokens[pos]
+            if token[0] != kind:
+                raise _ArgumentSyntaxError("Syntax Error")
+            pos += 1
+            return token[1]
+
+        def fold(node):
+            # anything that doesn't reference a label always has the same value, so work it out
+            # now (once per unique argument) rather than every time the argument is evaluated
+            children = node[2:] if node[0] == "op" else node[1:]
+            for child in children:
+                if child[0] != "int":
+                    return node
+            return ("int", InstructionArgument._evaluateNode(node, None, None))
+
+        def parseExpr():
+            node = parseTerm()
+            while peek() == "+" or peek() == "-":
+                operator = take(peek())
+                node = fold(("op", _BINARY_OPERATORS[operator], node, parseTerm()))
+            return node
+
+        def parseTerm():
+            node = parseUnary()
+            while peek() == "*":
+                take("*")
+                node = fold(("op", _BINARY_OPERATORS["*"], node, parseUnary()))
+            return node
+
+        def parseUnary():
+            if peek() == "-":
+                take("-")
+                return fold(("neg", parseUnary()))
+            if peek() == "+":
+                take("+")
+                return parseUnary()
+            return parsePrimary()
+
+        def parsePrimary():
+            kind = peek()
+
+            if kind == "int" or kind == "label":
+                return (kind, take(kind))
+
+            if kind == "%":
+                operatorName = take("%")
+                if not operatorName in _PERCENT_OPERATORS:
+                    raise _ArgumentSyntaxError(f'Unknown operator "%{operatorName}"')
+                take("(")
+                node = parseExpr()
+                take(")")
+                return fold((operatorName, node))
+
+            take("(")
+            node = parseExpr()
+            take(")")
+            return node
+
+        # a lone register like $sp
+        if peek() == "reg" and tokens[1][0] is None:
+            return take("reg"), None
+
+        node = parseExpr()
+        registerNumber = None
+
+        # an offset register like 4($sp)
+        if peek() == "(":
+            take("(")
+            registerNumber = take("reg")
+            take(")")
+
+        if peek() is not None:
+            raise _ArgumentSyntaxError("Syntax Error")
+
+        return registerNumber, node
+
+    @staticmethod
+    def _evaluateNode(node, labels, errors):
+        """ Evaluate an expression tree from InstructionArgument._parse().
+        Labels that aren't defined evaluate to 0 and add an AssemblyMessage to [errors] """
+
+        kind = node[0]
+
+        if kind == "int":
+            return node[1]
+
+        if kind == "label":
+            name = node[1]
+            if labels is None: # placeholder label (labels aren't known yet)
+                return 0
+            if name in labels:
+                return labels[name]
+            errors.append(UndefinedLabelMessage(f'Label "{name}" is not defined'))
+            return 0
+
+        if kind == "neg":
+            return -InstructionArgument._evaluateNode(node[1], labels, errors)
+
+        if kind == "hi":
+            return (InstructionArgument._evaluateNode(node[1], labels, errors) >> 16) & 0xFFFF
+
+        if kind == "lo":
+            return InstructionArgument._evaluateNode(node[1], labels, errors) & 0xFFFF
+
+        _, function, left, right = node
+        return function(
+            InstructionArgument._evaluateNode(left, labels, errors),
+            InstructionArgument._evaluateNode(right, labels, errors)
+        )
 
     @staticmethod
     def evaluate(expr, labels=None):
         """ Evaluate the integer value of this argument.
         Requires a [labels] argument in case this instruction argument references a label.
-        If this is the first pass, and we don't know the labels yet, set this to None.
+        If we don't know the labels yet, set this to None.
         A placeholder label with at address 0 will be used instead.
 
         Return the value of this argument plus an AssemblyMessage argument if this operation returned
         an error, otherwise None
         """
 
-        # to evaluate these expressions, we're going to use eval(), since i dont feel like writing a parser
-        # to mitigate security risks, we're going to restrict use of builtins and the global scope
-
-        # per https://realpython.com/python-eval-function, panic if the name __class__ is used
-        if "__class__" in expr:
-            raise Exception("Name in expression not allowed")
-
-        if not labels:  # if we don't know any of the labels yet we're going to have to find them manually
-            labels = {}
-            # matches a string of characters that starts with a letter or underscore and is not preceded by
-            # a $ or %
-            for match in re.findall(r'(?<![$%])\b[a-zA-Z_]\w{0,}', string=expr):
-                labels[match] = 0
-
-        # replace the % operator prefix with two underscores (%hi -> __hi)
-        expr = expr.replace("%", "__")
-
-        # replace instances of stuff like, 4($sp) with 4+($sp)
-        def repl(matchObject: re.Match):
-            boundary = matchObject.group()
-            return boundary[0]+"+"+boundary[1]
-        # match boundaries between a symbol and an opening parentheses
-        expr = re.sub(r'[\d\)]\(', repl=repl, string=expr)
-
-        # replace $sp, $31, etc. with a getRegisterNumber expression
-        def repl(matchObject: re.Match):
-            registerName = matchObject.group()
-            return '__reg("{}")'.format(registerName)
-
-        expr = re.sub(r'\$\w+', repl=repl, string=expr)
-
-        # build global scope with relevant operator definitions and variables
-        globalScope = {
-            "__builtins__": {},  # used to prevent security risks
-            "__reg": lambda r: InstructionArgument(InstructionArgument.getRegisterNumber(r)),
-            "__lo": lambda n: (n << 16) >> 16,  # find low 16 bits of word
-            "__hi": lambda n: (n >> 16)       # find high 16 bits of word
-        }
-
-        # insert label definitions into global scope
-
-        for labelName, labelAddress in labels.items():
-            globalScope[labelName] = labelAddress
-
-        evald = 0  # default to 0 in case there is an error parsing
-        err = None
-
-        try:
-            evald = eval(expr, globalScope, {})
-        except NameError as e:
-            nameNotDefined = str(e).split("'")[1]  # parse from the exception
-            err = AssemblyMessage(f'Label "{nameNotDefined}" is not defined')
-        except SyntaxError as e:
-            err = AssemblyMessage(f'Syntax Error')
-
-        if type(evald) == int:
-            return InstructionArgument(evald), err
-        return evald, err
+        parsed = _parseArgument(expr)
+
+        if type(parsed) == str: # syntax errors are cached as their message
+            return InstructionArgument(0), AssemblyMessage(parsed)
+
+        registerNumber, node = parsed
+
+        if node is None:
+            return InstructionArgument(registerNumber), None
+
+        if node[0] == "int": # most arguments are (or fold down to) a constant
+            value = node[1]
+            err = None
+        else:
+            errors = []
+            value = InstructionArgument._evaluateNode(node, labels, errors)
+            err = errors[0] if errors else None
+
+        if registerNumber is None:
+            return InstructionArgument(value), err
+        return InstructionArgument(registerNumber, offset=value), err
+
+
+class _ArgumentSyntaxError(Exception):
+    """ Raised while parsing an instruction argument that isn't valid """
+
+@functools.lru_cache(maxsize=4096)
+def _parseArgument(expr):
+    # parsed argument expressions, shared by fixups and every Assembly instance:
+    # (registerNumber, node), or the AssemblyMessage text if it's a syntax error
+    try:
+        return InstructionArgument._parse(expr)
+    except _ArgumentSyntaxError as e:
+        return str(e)
+
+
+@functools.lru_cache(maxsize=256)
+def _parseArgFormat(argFormatString):
+    # "rs,imm+rt" -> (("rs",), ("imm", "rt")), see MIPSInstructionFormat.buildInstructionCode
+    return tuple(tuple(arg.split("+")) for arg in argFormatString.split(","))
 
 """ Utility class for loading and packing arguments into a 32-bit instruction """
 
@@ -197,54 +436,41 @@ class MIPSInstructionFormat:
     def __init__(self, name=None):
         self.name = name
         self._args = []
+        self._argNameSet = frozenset()
 
     def argument(self, name, bits):
-        self._args.append([name, bits])
+        # fields are stored as [name, bits, mask, shift], with the mask and shift computed once here
+        # instead of once per encoded instruction. adding a field moves every previous field further left
+        for arg in self._args:
+            arg[3] += bits
+        self._args.append([name, bits, (1 << bits)-1, 0])
+        self._argNameSet = self._argNameSet | {name}
         return self
 
     @property
     def argNames(self):
         return list([a[0] for a in self._args])
-    
-    def _toBits(self, n, numBits):
-        """
-        convert [n] into a bit array [numBits] bits long 
-        
-        example: _toBits(50, 6) -> [1, 1, 0, 0, 1, 0]
-        """
-        bitArray = []
-        for i in range(0, numBits):
-            positionValue = 2**(i)
-            bit = (n//positionValue) % 2
-            bitArray.insert(0, bit)
-        return bitArray
-
-    def _bitsToInt(self, bitArray):
-        """
-        convert [bitArray] into a single number
 
-        example: _bitArrayToInt([1, 1, 0, 0, 1, 0]) -> 50 (0b110010)
-        """
-        n = 0
-        for i in range(len(bitArray)-1, -1, -1):
-            positionValue = 2**(len(bitArray)-i-1)
-            bit = bitArray[i]
-            n += bit*positionValue
-        return n
+    def wordFromArgs(self, argValues):
+        """ With the provided argument values, create the 32-bit integer value of an instruction with this format """
+        word = 0
+
+        # mask each field and shift it directly into place, so for an I-type instruction this is just
+        # (op<<26) | (rs<<21) | (rt<<16) | imm
+        # arguments that weren't provided are left as 0
+        for argName, argSize, argMask, argShift in self._args:
+            word |= (argValues.get(argName, 0) & argMask) << argShift
+
+        return word
 
     def byteCodeFromArgs(self, argValues):
         """ With the provided argument values, create a bytes-like representation of an instruction with this format """
-        bits = []
-
-        for argName, argSize in self._args:
-            bits += self._toBits(argValues[argName], argSize)
-        
         # Use big endian so the order is correct idk man
-        return struct.pack(">I", self._bitsToInt(bits))
+        return self.wordFromArgs(argValues).to_bytes(4, "big")
     
     def buildInstructionCode(self, argFormatString, argStrings, presetArgs={}, labels=None):
         """
-        Build a complete sequence of bytes representing the finished instruction
+        Build the 32-bit integer value of the finished instruction
         given unparsed and preset instruction arguments
 
         Arguments:
@@ -255,7 +481,7 @@ class MIPSInstructionFormat:
         
         presetArgs      - other arguments to be set manually (not parsed)
 
-        labels          - assembler label table to assist in parsing (not required for first-pass)
+        labels          - assembler label table to assist in parsing (None if the labels aren't known yet)
 
         argFormat examples:
 
@@ -264,9 +490,9 @@ class MIPSInstructionFormat:
         "rs,imm+rt" // args[0] is rs, args[1] is rt offset by imm
         """
 
-        # parse argFormat
+        # parse argFormat (there are only a handful of these, so each one is only parsed once)
 
-        argCorresponding = [arg.split("+") for arg in argFormatString.split(",")]
+        argCorresponding = _parseArgFormat(argFormatString)
 
         # parse arg strings
         argValues = {k:v for k,v in presetArgs.items()} # copy presetArgs into argValues to avoid modifying the argument
@@ -282,8 +508,7 @@ class MIPSInstructionFormat:
                     errors.append(err)
             else: # there is an offset
                 offsetArgName, argName = argFormat
-                argParsed = InstructionArgument.evaluate(argExpr)
-                val, err = argParsed
+                val, err = InstructionArgument.evaluate(argExpr, labels)
                 argValues[argName] = val.value
 
                 offset = 0 # default to 0 if no offset parsable
@@ -298,21 +523,14 @@ class MIPSInstructionFormat:
                 if err:
                     errors.append(err)
         
-        # fill missing arguments with value 0
-
-        for requiredArg in self.argNames:
-            if not requiredArg in argValues:
-                argValues[requiredArg] = 0
-        
-        # check for extraneous arguments
+        # check for extraneous arguments (missing arguments are filled in with 0 by wordFromArgs)
 
         for suppliedArg in argValues:
-            if not suppliedArg in self.argNames:
+            if not suppliedArg in self._argNameSet:
                 errors.append(AssemblyMessage(f'Extraneous argument with name "{suppliedArg}"'))
 
-        code = InstructionFormats.IType.byteCodeFromArgs(argValues)
-        return code, errors
-a
+        return self.wordFromArgs(argValues), errors
+
 class InstructionFormats:
     IType = (
         MIPSInstructionFormat()
@@ -345,24 +563,34 @@ class AssemblerDataTable:
             _data = json.load(fl)
         
         self.meta = _data["meta"]
-        self.ignoredDirectives = _data["directives"]["ignore"]
+        self.ignoredDirectives = frozenset(_data["directives"]["ignore"])
         self.itypeInstructions = _data["instructions"]["i_type"]
 
+        # Encoding info for each supported instruction [mnemonic : (format, argFormatString, presetArgs)]
+        self.instructionEncodings = {}
+
+        for mnemonic, instructionData in self.itypeInstructions.items():
+            self.instructionEncodings[sys.intern(mnemonic)] = (
+                InstructionFormats.IType,
+                instructionData["arg_format"],
+                {"op": instructionData["opcode"]}
+            )
+
 class Assembly:
+    __slots__ = (
+        "labels", "machCodeLineEnds", "machCode", "currentPos", "currentLine",
+        "errors", "warnings", "sourceLines", "fixups", "polluted",
+        "asmDataTable", "ident",
+        "WARN_UNKNOWN_DIRECTIVE", "MAX_STACK_SIZE", "MAX_HEAP_SIZE", "_IO_SPACE_SIZE"
+    )
+
     def __init__(self):
         # Stores labels [labelName : codePosition]
         self.labels = {}
 
-        # Stores forward references to labels [codePosition : labelName]
-        self.labelReferences = {}
-
-        # Stores forward references to labels in the code [lineNumber : labelName]
-        # Sole purpose of outputting error messages for invalid label names
-        self.codeLabelReferences = {}
-
-        # Debug:
-        self.machCodeLines = []
-        self.positionAtLastLine = 0
+        # Debug: code position at the end of each source line. Each line's code starts where the
+        # previous line's ends (or after the i/o space, for the first line)
+        self.machCodeLineEnds = []
 
         # Outputted machine code
         self.machCode = bytearray()
@@ -379,6 +607,10 @@ class Assembly:
         # Contents of current source file (split by line)
         self.sourceLines = []
 
+        # Instructions that referenced labels which weren't defined yet when they were reached,
+        # to be encoded again once the whole source has been read [(codePosition, lineNumber, instruction, args)]
+        self.fixups = []
+
         # Has this source been processed yet? (Assembly source can only be processed once per Assembly instance)
         self.polluted = False
 
@@ -397,13 +629,14 @@ class Assembly:
         # VM Constants
         self._IO_SPACE_SIZE = 256
 
-    def addBytesToCode(self, bytes):
-        for b in bytes:
-            self.machCode.append(b)
-            self.currentPos += 1
+    def addInstructionToCode(self, word):
+        # instructions are stored big endian (see MIPSInstructionFormat.byteCodeFromArgs)
+        _BE_U32.pack_into(self.machCode, self.currentPos, word)
+        self.currentPos += 4
 
-    def toWord(self, n: int):  # Converts an int32 to an array of four bytes
-        return struct.pack("I", n)
+    def addWordToCode(self, n: int):  # Writes an int32 as four little endian bytes
+        _LE_U32.pack_into(self.machCode, self.currentPos, n)
+        self.currentPos += 4
 
     def createWarning(self, message):  # Creates a new assembler warning at the current line
         self.warnings.append(
@@ -415,19 +648,37 @@ class Assembly:
             AssemblyMessage(message, self.currentLine)
         )
 
-    def onDirective(self, directive, args, isFirstPass):
-        if directive == "word":
-            self.addBytesToCode(self.toWord(int(args[0])))
-        elif directive == "ident":
-            self.ident = args[0]
+    def onWordDirective(self, args):
+        self.addWordToCode(int(args[0]))
+
+    def onIdentDirective(self, args):
+        self.ident = args[0]
+
+    # Directives that do something [directiveName : handler]
+    _directiveHandlers = {
+        "word": onWordDirective,
+        "ident": onIdentDirective
+    }
+
+    def onDirective(self, directive, args):
+        handler = self._directiveHandlers.get(directive)
+
+        if handler is not None:
+            handler(self, args)
         elif directive in self.asmDataTable.ignoredDirectives:
             pass
         else:
-            if self.WARN_UNKNOWN_DIRECTIVE and isFirstPass:
+            if self.WARN_UNKNOWN_DIRECTIVE:
                 msg = 'Unknown assembler directive "{}"'.format(directive)
                 self.createWarning(msg)
 
     def onLabel(self, labelName):
+        # labels are resolved as soon as they're defined (only forward references wait for a fixup), so a
+        # redefinition would make earlier and later references disagree. keep the first definition and report it
+        if labelName in self.labels:
+            self.trackErrorsToCurrentLine([AssemblyMessage(f'Label "{labelName}" is already defined')])
+            return
+
         self.labels[labelName] = self.currentPos
 
     def trackErrorsToCurrentLine(self, errors):
@@ -440,220 +691,251 @@ class Assembly:
 
             self.errors.append(err)
 
-    def onInstruction(self, instruction, args, isFirstPass):
-        # Process pseudo-instructions
+    # Pseudo-instructions and the real instructions they stand for [name : (instruction, args)]
+    _pseudoInstructions = {
+        "nop": ("sll", ["$zero", "$zero", "0"])
+    }
 
-        if instruction == "nop":
-            return self.onInstruction("sll", ["$zero", "$zero", "0"], isFirstPass)
+    def encodeInstruction(self, instruction, args):
+        """ Encode [instruction] using the labels defined so far, returning the instruction word and any errors.
+        Returns None for the word if the instruction is unknown """
 
-        labels = None if isFirstPass else self.labels
+        encoding = self.asmDataTable.instructionEncodings.get(instruction)
 
-        # Process I-Type instructions
-        if instruction in self.asmDataTable.itypeInstructions:
-            instructionData = self.asmDataTable.itypeInstructions[instruction]
-            argFormat = instructionData["arg_format"]
-            opcode = instructionData["opcode"]
+        if encoding is None:
+            # Process pseudo-instructions (these are only checked for once the instruction table misses)
+            pseudoInstruction = self._pseudoInstructions.get(instruction)
+            if pseudoInstruction is not None:
+                return self.encodeInstruction(*pseudoInstruction)
 
-            code, errors = InstructionFormats.IType.buildInstructionCode(
-                argFormatString=argFormat,
-                argStrings=args,
-                presetArgs={"op": opcode},
-                labels=labels
-            )
+            return None, [AssemblyMessage('Unknown instruction "{}"'.format(instruction))]
+
+        instructionFormat, argFormat, presetArgs = encoding
+
+        return instructionFormat.buildInstructionCode(
+            argFormatString=argFormat,
+            argStrings=args,
+            presetArgs=presetArgs,
+            labels=self.labels
+        )
+
+    def onInstruction(self, instruction, args):
+        word, errors = self.encodeInstruction(instruction, args)
+
+        if word is None:
             self.trackErrorsToCurrentLine(errors)
-            self.addBytesToCode(code)
             return
-        
-        self.createError('Unknown instruction "{}"'.format(instruction))
+
+        # this might be a forward reference to a label further down in the source. every instruction is
+        # the same size, so leave the word as is for now and encode it again once all the labels are known
+        for err in errors:
+            if type(err) == UndefinedLabelMessage:
+                self.fixups.append((self.currentPos, self.currentLine, instruction, args))
+                break
+        else:
+            self.trackErrorsToCurrentLine(errors)
+
+        self.addInstructionToCode(word)
+
+    def resolveFixups(self):
+        """ Encode instructions that referenced labels that weren't defined yet, now that every label is known """
+
+        for codePos, lineNumber, instruction, args in self.fixups:
+            self.currentLine = lineNumber
+            word, errors = self.encodeInstruction(instruction, args)
+            self.trackErrorsToCurrentLine(errors)
+            _BE_U32.pack_into(self.machCode, codePos, word)
+
+        # keep errors in source order
+        if self.fixups:
+            self.errors.sort(key=lambda err: err.line)
 
     def loadSourceFile(self, fl):
         if self.sourceLines:
             raise Exception("Assembly source already loaded")
 
-        with open(fl) as fl:
-            flContents = fl.read()
+        # read the file one line at a time rather than loading the whole thing and splitting it up.
+        # text mode converts windows line endings to unix ones as it goes; only the newline is dropped,
+        # so errors and the debug listing show the source exactly as it was written
+        with open(fl, encoding="utf-8", errors="replace") as fl:
+            self.sourceLines = [line.rstrip("\n") for line in fl]
+
+    def runPass(self):
+        # adds i/o space to program. the output buffer is zero initialized, so there's nothing to write
+        self.currentPos += self._IO_SPACE_SIZE
 
-        # Convert windows line endings to unix ones
-        flContents = flContents.replace("\r\n", "\n")
-        self.sourceLines = flContents.split("\n")
+        # look these up once instead of once per line
+        parseLine = self.parseLine
+        processParsedLine = self.processParsedLine
+        addLineEnd = self.machCodeLineEnds.append
 
-    def runPass(self, isFirstPass=True):
-        # adds i/o space to program
-        for i in range(self._IO_SPACE_SIZE):
-            self.addBytesToCode(bytes([0]))
+        for lineNumber, line in enumerate(self.sourceLines, 1):
+            self.currentLine = lineNumber
 
-        for line in self.sourceLines:
-            self.processLine(line, isFirstPass=isFirstPass)
+            processParsedLine(parseLine(line.translate(_TAB_TRANSLATION)))
 
             # for debug purposes only
-            bytesAddedThisLine = self.machCode[self.positionAtLastLine:]
-            self.machCodeLines.append(bytesAddedThisLine)
-            self.positionAtLastLine = self.currentPos
+            addLineEnd(self.currentPos)
 
     def assemble(self, verbose=True):
         if self.polluted:
             raise Exception(
                 "Assembly source can only be processed once per Assembly instance")
 
-        self.runPass()
+        # the source is only read once; references to labels that come later in the source
+        # are patched in afterwards
+        # each line assembles to at most one word, so allocate enough space for the worst case up front
+        # and trim off whatever wasn't used at the end
+        self.machCode = bytearray(self._IO_SPACE_SIZE + 4*len(self.sourceLines))
 
-        # reset variables and whatnot for the second pass
-        self.currentPos = 0
-        self.currentLine = 1
-        self.machCode = bytearray()
+        self.runPass()
+        self.resolveFixups()
 
-        self.runPass(isFirstPass=False)
+        del self.machCode[self.currentPos:]
 
         self.polluted = True
         if verbose:
+            # build the report up and print it in one go, since there can be a lot of these
+            report = []
             for error in self.errors:
-                print("Error:", error.message)
-                print('    on line {}: "{}"'.format(
+                report.append("Error: " + error.message)
+                report.append('    on line {}: "{}"'.format(
                     error.line, self.sourceLines[error.line-1].strip()))
-            print()
+            report.append("")
             for warn in self.warnings:
-                print("Warning:", warn.message)
-                print('    on line {}: "{}"'.format(
+                report.append("Warning: " + warn.message)
+                report.append('    on line {}: "{}"'.format(
                     warn.line, self.sourceLines[warn.line-1].strip()))
-            print()
+            report.append("")
 
-            print("Assembly finished with {} errors and {} warnings".format(
+            report.append("Assembly finished with {} errors and {} warnings".format(
                 len(self.errors),
                 len(self.warnings)
             ))
-
-    def _removeComments(self, line):
-        """ return [line] with any comments removed """
-        if not "#" in line:
-            return line
-
-        # Find the first instance of a # character that isn't enclosed inside a string
-
-        for i, c in enumerate(line):
-            if c == "#":
-                if not self._isCharEnclosed(i, line):
-                    return line[:i]
+            print("\n".join(report))
 
     def _split(self, string, delimiter):
         """ split [string] on any delimiters that aren't enclosed in strings. delimiter can only be one character """
-        segment = ""
+        if not '"' in string: # no strings means every delimiter counts, so let str.split do the work
+            segments = string.split(delimiter)
+            if not segments[-1]:
+                segments.pop()
+            return segments
+
         segments = []
+        segmentStart = 0
+        inString = False
 
         for i, c in enumerate(string):
-            if c == delimiter and not self._isCharEnclosed(i, string):
-                segments.append(segment)
-                segment = ""
-            else:
-                segment += c
+            if c == '"':
+                inString = not inString
+            elif c == delimiter and not inString:
+                segments.append(string[segmentStart:i])
+                segmentStart = i+1
 
-        if segment:
-            segments.append(segment)
+        if segmentStart < len(string):
+            segments.append(string[segmentStart:])
 
         return segments
 
-    def _isCharEnclosed(self, charIndex, string):
-        """ Return true if the character at charIndex is enclosed in double quotes (a string) """
-        numQuotes = 0  # if the number of quotes past this character is odd, than this character lies inside a string
-        for i in range(charIndex, len(string)):
-            if string[i] == '"':
-                numQuotes += 1
-
-        return numQuotes % 2 == 1
+    def parseLine(self, line):
+        """
+        Tokenize a line of assembly source into a tuple of (lineType, name, args), where lineType is
+        one of "label", "directive", or "instruction"; or None if the line is empty
 
-    def processLine(self, line, isFirstPass):
-        # Determine type of line
+        examples:
+            "main:"             -> ("label", "main", [])
+            ".align 2"          -> ("directive", "align", ["2"])
+            "lui $2,%hi(a)"     -> ("instruction", "lui", ["$2", "%hi(a)"])
+        """
+        # blank lines and comments can be recognized from the first non-whitespace character alone,
+        # so they don't need to go through the regex
+        line = line.lstrip()
+        if not line or line[0] == "#":
+            return (None, None, [])
 
-        line = line.strip()  # remove trailing and leading whitespace
-        line = self._removeComments(line)  # remove comments from line
-        # Convert tabs into single spaces (makes parsing easier)
-        line = line.replace("\t", " ")
+        match = _LINE_RE.match(line)
 
-        # Remove comments
+        if match is None:  # nothing sensible to split up, so it'll end up as an unknown instruction
+            return ("instruction", line.strip(), [])
 
-        if line == "":  # is line empty?
-            return
-        elif line.endswith(":"):  # is the line a label?
-            if not isFirstPass:
-                return  # don't parse labels twice
-            self.onLabel(line.rstrip(":"))
-        elif line.startswith("."):  # is the line a directive?
-            line = line.lstrip(".")  # remove the dot from the directive
-            # results in a thing like ["align", "2"]
-            parts = self._split(line, " ")
+        label, dot, name, argString = match.groups()
 
-            directive = parts[0]
-            argString = ""  # there might not be any arguments
+        if label is not None:
+            return ("label", label, [])
+        elif name is None:  # line is empty (or just a comment)
+            return (None, None, [])
 
-            if len(parts) > 1:
-                argString = parts[1]
+        lineType = "directive" if dot else "instruction"
 
-            args = self._split(argString, ",")
-            # remove surrounding whitespace from arguments (usually only applicable if the commas
-            args = list([arg.strip() for arg in args])
-            # separating the arguments have trailing spaces)
+        # names and arguments are interned since they're used as dict keys for the instruction table,
+        # the directive handlers, and the argument cache (see InstructionArgument.evaluate)
+        name = sys.intern(name)
 
-            self.onDirective(directive, args, isFirstPass)
-        else:  # it's probably an instruction
-            # results in a thing like ["lui", "$2,%hi(a)"]
-            parts = self._split(line, " ")
+        if not argString:  # there might not be any arguments
+            return (lineType, name, [])
 
-            instruction = parts[0]
-            argString = ""  # there might not be any arguments
+        # remove surrounding whitespace from arguments (usually only applicable if the commas
+        # separating the arguments have trailing spaces)
+        args = [sys.intern(arg.strip()) for arg in self._split(argString, ",")]
 
-            if len(parts) > 1:
-                argString = parts[1]
+        return (lineType, name, args)
 
-            args = self._split(argString, ",")
-            # remove surrounding whitespace from arguments (usually only applicable if the commas
-            args = list([arg.strip() for arg in args])
-            # separating the arguments have trailing spaces)
+    def processParsedLine(self, parsedLine):
+        """ Assemble a line tokenized by parseLine() """
+        lineType, name, args = parsedLine
 
-            self.onInstruction(instruction, args, isFirstPass)
-
-        self.currentLine += 1
+        if lineType == "label":
+            self.onLabel(name)
+        elif lineType == "directive":
+            self.onDirective(name, args)
+        elif lineType == "instruction":
+            self.onInstruction(name, args)
 
     def findEntryPoint(self):
         """ return memory address of main routine """
         return self.labels["main"]
 
     def getMachineCode(self):
-        return bytes(self.machCode)
+        # a read-only view, so callers that only need to read or write out the code don't copy it
+        return memoryview(self.machCode).toreadonly()
 
     def makeHeader(self, programSize, programCounter, stackSize, heapSize):
         # see header format above
-        headerFormat = "IIII"
-
         totalMemorySize = programSize+stackSize+heapSize
         stackPointer = programSize+stackSize
 
-        structData = [0x4E494253, programCounter,
-                      stackPointer, totalMemorySize]
-
-        return struct.pack(headerFormat, *structData)
+        return _HEADER_STRUCT.pack(b"SBIN", programCounter, stackPointer, totalMemorySize)
 
     def exportAsBinary(self, filename):
         # see format above
         with open(filename, 'wb') as fl:
-            programData = self.getMachineCode()
+            # machCode is written as-is (file objects accept any bytes-like object),
+            # and the header gets its own write so the program is never copied
             header = self.makeHeader(
-                programSize=len(programData),
+                programSize=len(self.machCode),
                 programCounter=self.findEntryPoint(),
                 stackSize=self.MAX_STACK_SIZE,
                 heapSize=self.MAX_HEAP_SIZE
             )
 
-            fl.write(header + programData)
+            fl.write(header)
+            fl.write(self.machCode)
 
     def exportDebugFile(self, filename):
-        with open(filename, "w") as fl:
-            for sourceLine, lineCode in zip(self.sourceLines, self.machCodeLines):
-                fl.write(sourceLine+"\n")
-                if lineCode:
-                    codeHex = lineCode.hex(" ")
-                    codeBin = ""
+        # build the whole file first and write it all at once
+        output = []
+        lineStart = self._IO_SPACE_SIZE
+
+        for sourceLine, lineEnd in zip(self.sourceLines, self.machCodeLineEnds):
+            output.append(sourceLine+"\n")
+            lineCode = self.machCode[lineStart:lineEnd]
+            lineStart = lineEnd
+            if lineCode:
+                codeHex = lineCode.hex(" ")
+                codeBin = "".join([_BYTE_BINARY_STRINGS[byte] for byte in lineCode])
 
-                    for i in range(0, len(lineCode)):
-                        byte = lineCode[i]
-                        codeBin += "{:08b}".format(byte)+" "
+                output.append(f"    [{codeHex}] {codeBin}\n\n")
 
-                    fl.write(f"    [{codeHex}] {codeBin}\n\n")
+        with open(filename, "w") as fl:
+            fl.writelines(output)
@@ -1,8 +1,10 @@
 import sys
 
-from pycparser import c_parser
+if __name__ == '__main__':
+    # pycparser is slow to import, so only load it when this is actually being run
+    from pycparser import c_parser
 
-text = r"""
+    text = r"""
 typedef int var;
 typedef int list;
 
@@ -15,7 +17,6 @@ var bruh(void)
 }
 """
 
-if __name__ == '__main__':
     parser = c_parser.CParser()
     ast = parser.parse(text)
     print("Before:")
@@ -11,30 +11,131 @@ with scratch.ScratchProject.fromFile("project.sb3") as proj:
 import zipfile
 import shutil
 from pathlib import Path
-from glob import glob
 import os
 import json
 import random
+import time
+
+try:
+    import orjson  # much faster than the json module for big project.json files, but optional
+except ImportError:
+    orjson = None
 
 TEMPDIR = "tmp/"
 
+# Names of each type of input value, indexed by type id (see BlockInput.valueTypeName)
+_VALUE_TYPE_NAMES = (
+    None,       # 0: undefined
+    "id",       # 1: shadow
+    None,       # 2: unknown
+    "id",       # 3: shadow ("obscured")
+    "number",   # 4: number
+    "number",   # 5: positive number
+    "number",   # 6: positive integer
+    "number",   # 7: integer
+    "number",   # 8: angle
+    "color",    # 9: color
+    "string",   # 10: string
+    "broadcast",# 11: broadcast
+    "variable", # 12: variable
+    "list",     # 13: list
+)
+
+# project.json target keys that are stored on a ScratchTarget as-is
+_TARGET_KEYS = ("comments", "sounds", "costumes", "currentCostume", "volume", "layerOrder")
+_STAGE_KEYS = ("tempo", "videoTransparency", "videoState", "textToSpeechLanguage")
+_SPRITE_KEYS = ("visible", "x", "y", "size", "direction", "draggable", "rotationStyle")
+
+# asset formats that aren't worth deflating when saving: the images and mp3s are already compressed,
+# and wav (raw PCM) barely shrinks for the time it takes
+_STORED_ASSET_EXTENSIONS = (".png", ".jpg", ".jpeg", ".gif", ".mp3", ".wav")
+
 def remove_ext(filename):
     return os.path.splitext(filename)[0]
 
+def _loadJSON(data: bytes):
+    """ Parse raw json data, using orjson if it's available """
+    if orjson:
+        return orjson.loads(data)
+    return json.loads(data)
+
 def randomId(size=16):
-    return "".join([random.choice("1234567890abcdef") for i in range(size)])
+    # [size] random hex digits, generated all at once
+    return f"{random.getrandbits(size*4):0{size}x}"
 
 class ScratchAsset:
+    # asset files can be big, so their contents aren't read until something asks for ScratchAsset.data.
+    # _data holds contents that were set explicitly; otherwise they're read from the file at self.path
+    # or, if _archive is set, from the (archive path, ZipInfo) of the archive member it points to
+
     def __init__(self, location):
         self.path = Path(location)
         self.name = self.path.name
-        with open(location, "rb") as fl:
-            self.data = fl.read()
+        self._data = None
+        self._archive = None
+
+    @classmethod
+    def fromArchive(cls, archivePath, info: zipfile.ZipInfo):
+        """ Make an asset that refers to a member of a zip (sb3) archive, read on demand """
+        asset = cls.__new__(cls)
+        asset.path = Path(info.filename)
+        asset.name = asset.path.name
+        asset._data = None
+        asset._archive = (archivePath, info)
+        return asset
+
+    @property
+    def data(self) -> bytes:
+        if self._data is not None:
+            return self._data
+        if self._archive:
+            archivePath, info = self._archive
+            with zipfile.ZipFile(archivePath, 'r') as zip:
+                return zip.read(info)
+        return self.path.read_bytes()
+
+    @data.setter
+    def data(self, value: bytes):
+        self._data = value
+
+    def writeToArchive(self, zip: zipfile.ZipFile, sourceArchives: dict=None):
+        """ Add this asset to an open zip archive, streaming it across if it hasn't been loaded into memory.
+        Opening an archive reads its whole directory, so when copying a lot of assets pass in a
+        [archive path : open ZipFile] dict to share; archives get opened into it as needed, and closing them is up to the caller """
+        if self.name.lower().endswith(_STORED_ASSET_EXTENSIONS):
+            compressType = zipfile.ZIP_STORED
+        else:
+            compressType = zip.compression
+
+        if self._data is not None:
+            zip.writestr(self.name, self._data, compress_type=compressType)
+        elif self._archive:
+            archivePath, srcInfo = self._archive
+            destInfo = zipfile.ZipInfo(self.name, time.localtime()[:6])
+            destInfo.compress_type = compressType
+
+            if sourceArchives is None:
+                with zipfile.ZipFile(archivePath, 'r') as src:
+                    self._copyArchiveMember(src, srcInfo, zip, destInfo)
+            else:
+                src = sourceArchives.get(archivePath)
+                if src is None:
+                    src = sourceArchives[archivePath] = zipfile.ZipFile(archivePath, 'r')
+                self._copyArchiveMember(src, srcInfo, zip, destInfo)
+        else:
+            zip.write(self.path, self.name, compress_type=compressType)
+
+    @staticmethod
+    def _copyArchiveMember(src: zipfile.ZipFile, srcInfo, dest: zipfile.ZipFile, destInfo):
+        with src.open(srcInfo) as srcFile, dest.open(destInfo, 'w') as destFile:
+            shutil.copyfileobj(srcFile, destFile, 1 << 20)
 
     def __repr__(self):
         return self.data
 
 class BlockInput:
+    __slots__ = ("inputName", "value", "defaultValue", "noShadow")
+
     def __init__(self, inputName: str, value, defaultValue=None, noShadow=False):
         """ From the Scratch wiki:
 
@@ -71,22 +172,7 @@ class BlockInput:
     def valueTypeName(self):
         """ Convert self.valueTypeId (an integer) into a more useful description of what type it is
         by looking it up in a table """
-        return [
-            None,       # 0: undefined
-            "id",       # 1: shadow
-            None,       # 2: unknown
-            "id",       # 3: shadow ("obscured")
-            "number",   # 4: number
-            "number",   # 5: positive number
-            "number",   # 6: positive integer
-            "number",   # 7: integer
-            "number",   # 8: angle
-            "color",    # 9: color
-            "string",   # 10: string
-            "broadcast",# 11: broadcast
-            "variable", # 12: variable
-            "list",     # 13: list
-        ][self.valueTypeId]
+        return _VALUE_TYPE_NAMES[self.valueTypeId]
     
     # BlockInput represents a key/value pair, where the key is BlockField.inputName
     def serializeValue(self):
@@ -105,12 +191,19 @@ class BlockInput:
         return f"<Input \"{self.inputName}\">"
 
 class Block:
+    # projects can have a lot of blocks, so skip the per-instance __dict__
+    __slots__ = (
+        "target", "id", "opcode", "inputs", "fields", "shadow", "_topLevel",
+        "parentId", "nextId", "x", "y", "mutation"
+    )
+
     def __init__(self, target, id: str):
         self.target = target
         self.id = id
         self.opcode = None
-        self.inputs = []
-        self.fields = []
+        # keyed by input/field name; dicts keep insertion order for serializing
+        self.inputs: dict[str, BlockInput] = {}
+        self.fields: dict[str, BlockField] = {}
         self.shadow = False
         # a kind of redundant variable; set if block.parent != null. don't modify
         self._topLevel = None
@@ -128,31 +221,38 @@ class Block:
         self.shadow = blockData["shadow"]
         self._topLevel = blockData["topLevel"]
 
-        for inputName, inputData in blockData["inputs"].items():
-            default = None
-            if len(inputData) == 3:
-                default = inputData[2]
-
-            input = BlockInput(inputName=inputName, value=inputData[1], defaultValue=default)
-            self.inputs.append(input)
-
-        for fieldName, fieldData in blockData["fields"].items():
-            field = BlockField(fieldName, fieldData[0], fieldData[1] if len(fieldData) > 1 else None)
-            self.fields.append(field)
+        self.inputs = {
+            inputName: BlockInput(inputName, inputData[1], inputData[2] if len(inputData) == 3 else None)
+            for inputName, inputData in blockData["inputs"].items()
+        }
+        self.fields = {
+            fieldName: BlockField(fieldName, fieldData[0], fieldData[1] if len(fieldData) > 1 else None)
+            for fieldName, fieldData in blockData["fields"].items()
+        }
         
         self.x = blockData.get("x", None)
         self.y = blockData.get("y", None)
         return self
     
     def inputByName(self, name):
-        for input in self.inputs:
-            if input.inputName == name:
-                return input
+        return self.inputs.get(name)
     
     def fieldByName(self, name):
-        for field in self.field:
-            if field.fieldName == name:
-                return field
+        return self.fields.get(name)
+
+    def addInput(self, input):
+        self.inputs[input.inputName] = input
+
+    def addField(self, field):
+        self.fields[field.fieldName] = field
+
+    def setInputs(self, *inputs):
+        """ Replace this block's inputs with the given BlockInputs """
+        self.inputs = {input.inputName: input for input in inputs}
+
+    def setFields(self, *fields):
+        """ Replace this block's fields with the given BlockFields """
+        self.fields = {field.fieldName: field for field in fields}
 
     
     def getBlock(self, blockId):
@@ -165,10 +265,10 @@ class Block:
         return self.target.getBlock(self.parentId)
 
     def _serializeInputs(self):
-        return {input.inputName: input.serializeValue() for input in self.inputs}
+        return {name: input.serializeValue() for name, input in self.inputs.items()}
     
     def _serializeFields(self):
-        return {field.fieldName: field.value for field in self.fields}
+        return {name: field.value for name, field in self.fields.items()}
 
     def serialize(self):
         baseData = {
@@ -192,10 +292,16 @@ class Block:
             })
         return baseData
 
+    def toJSON(self, indent=4):
+        """ Pretty-printed json of this block's serialized data """
+        return json.dumps(self.serialize(), indent=indent)
+
     def __repr__(self):
-        return json.dumps(self.serialize(), indent=4)
+        return f"<Block \"{self.opcode}\" id=\"{self.id}\">"
 
 class BlockField:
+    __slots__ = ("fieldName", "value", "varId")
+
     def __init__(self, name, value, varId=None):
         self.fieldName = name
         self.value = value
@@ -204,6 +310,8 @@ class BlockField:
         return f"<Field \"{self.fieldName}\": {repr(self.value)}>"
 
 class FunctionDefBlock(Block):
+    __slots__ = ()
+
     def __init__(self, target, id):
         super(target, id)
     
@@ -215,13 +323,15 @@ class FunctionDefBlock(Block):
 
     @property
     def prototypeBlock(self) -> Block:
-        return self.getBlock(self.inputs["custom_block"])
+        return self.getBlock(self.inputs["custom_block"].value)
 
     @property
     def argBlocks(self):
         return self.getBlock()
 
 class Variable:
+    __slots__ = ("id", "name", "value")
+
     def __init__(self, id, name, value=""):
         self.id = id
         self.name = name
@@ -232,10 +342,12 @@ class Variable:
 
 
 class List:
-    def __init__(self, id, name, contents=[]):
+    __slots__ = ("id", "name", "contents")
+
+    def __init__(self, id, name, contents=None):
         self.id = id
         self.name = name
-        self.contents = contents
+        self.contents = [] if contents is None else contents
 
     def __repr__(self):
         return f"<List \"{self.name}\": {self.contents}>"
@@ -258,6 +370,11 @@ class ScratchTarget:
         self.layerOrder = 0
         self.broadcasts: dict[str, str] = {}
 
+        # name -> variable/list/broadcast id lookups, kept in sync by the add methods
+        self._variablesByName: dict[str, Variable] = {}
+        self._listsByName: dict[str, List] = {}
+        self._broadcastIdsByName: dict[str, str] = {}
+
         # stage ony
         self.tempo = 60
         self.videoTransparency = 50
@@ -278,9 +395,11 @@ class ScratchTarget:
     # Getters and setters
 
     def findBroadcastId(self, name):
-        for id, bname in self.broadcasts.items():
-            if bname == name:
-                return id
+        return self._broadcastIdsByName.get(name)
+
+    def addBroadcast(self, id, name):
+        self.broadcasts[id] = name
+        self._broadcastIdsByName.setdefault(name, id)
 
     def getBlocks(self):
         return list(self._blocks.values())
@@ -289,23 +408,21 @@ class ScratchTarget:
         return list(self._variables.values())
 
     def findVariableByName(self, name):
-        for var in self.getVariables():
-            if var.name == name:
-                return var
+        return self._variablesByName.get(name)
     
     def findListByName(self, name):
-        for list in self.getLists():
-            if list.name == name:
-                return list
+        return self._listsByName.get(name)
 
     def addVariable(self, name, value=""):
         newId = randomId()
-        self._variables[newId] = Variable(newId, name, value)
+        var = self._variables[newId] = Variable(newId, name, value)
+        self._variablesByName.setdefault(name, var)
         return newId
     
-    def addList(self, name, value=[]):
+    def addList(self, name, value=None):
         newId = randomId()
-        self._lists[newId] = List(newId, name, value)
+        list = self._lists[newId] = List(newId, name, value)
+        self._listsByName.setdefault(name, list)
         return newId
     
     def getLists(self):
@@ -339,55 +456,53 @@ class ScratchTarget:
     def loadFromParse(self, data: dict):
         self.name = data["name"]
         self.isStage = data["isStage"]
-        self.comments = data["comments"]
-        self.currentCostume = data["currentCostume"]
-        self.costumes = data["costumes"]
-        self.sounds = data["sounds"]
-        self.volume = data["volume"]
-        self.layerOrder = data["layerOrder"]
-
-        # stage only
-        self.tempo = data.get("tempo", None)
-        self.videoTransparency = data.get("videoTransparency", None)
-        self.videoState = data.get("videoState", None)
-        self.textToSpeechLanguage = data.get("textToSpeechLanguage", None)
+        for key in _TARGET_KEYS:
+            setattr(self, key, data[key])
 
-        # non-stage only
-        self.visible = data.get("visible", None)
-        self.x = data.get("x", None)
-        self.y = data.get("y", None)
-        self.size = data.get("size", None)
-        self.direction = data.get("direction", None)
-        self.draggable = data.get("draggable", None)
-        self.rotationStyle = data.get("rotationStyle", None)
+        # stage only / non-stage only; whichever set doesn't apply just ends up as None
+        for key in _STAGE_KEYS + _SPRITE_KEYS:
+            setattr(self, key, data.get(key))
 
         # === parse important data: variables, lists, broadcasts, blocks ===
 
         # parse variables
 
-        self._variables = {}
-        for listId, list in data["variables"].items():
-            listName, contents = list
-            self._variables[listId] = Variable(listId, listName, value=contents)
+        self._variables = {
+            varId: Variable(varId, varName, value=value)
+            for varId, (varName, value) in data["variables"].items()
+        }
 
         # parse lists
 
-        self._lists = {}
-        for listId, list in data["lists"].items():
-            listName, contents = list
-            self._lists[listId] = List(listId, listName, contents=contents)
+        self._lists = {
+            listId: List(listId, listName, contents=contents)
+            for listId, (listName, contents) in data["lists"].items()
+        }
 
         # parse broadcasts
 
         self.broadcasts = data["broadcasts"]  # there's nothing really to parse
 
-        # parse blocks
+        # build the name lookups; like the old linear scans, the first entry with a given name wins
+
+        self._variablesByName = {}
+        for var in self._variables.values():
+            self._variablesByName.setdefault(var.name, var)
+
+        self._listsByName = {}
+        for list in self._lists.values():
+            self._listsByName.setdefault(list.name, list)
+
+        self._broadcastIdsByName = {}
+        for id, name in self.broadcasts.items():
+            self._broadcastIdsByName.setdefault(name, id)
 
-        self._blocks = {}
-        for blockId, blockData in data["blocks"].items():
-            newBlock = Block(target=self, id=blockId).loadFromParse(blockData)
+        # parse blocks
 
-            self._blocks[blockId] = newBlock
+        self._blocks = {
+            blockId: Block(target=self, id=blockId).loadFromParse(blockData)
+            for blockId, blockData in data["blocks"].items()
+        }
 
         return self
 
@@ -400,42 +515,23 @@ class ScratchTarget:
             "lists": {list.id: [list.name, list.contents] for list in self._lists.values()},
             "broadcasts": self.broadcasts,
             "blocks": {block.id: block.serialize() for block in self._blocks.values()},
-            "comments": self.comments,
-            "sounds": self.sounds,
-            "costumes": self.costumes,
-            "currentCostume": self.currentCostume,
-            "volume": self.volume,
-            "layerOrder": self.layerOrder
         }
 
-        if self.isStage:
-            # add stage data to baseData
-            baseData.update({
-                "tempo": self.tempo,
-                "videoTransparency": self.videoTransparency,
-                "videoState": self.videoState,
-                "textToSpeechLanguage": self.textToSpeechLanguage
-            })
-        else:
-            # add sprite data to baseData
-            baseData.update({
-                "visible": self.visible,
-                "x": self.x,
-                "y": self.y,
-                "size": self.size,
-                "direction": self.direction,
-                "draggable": self.draggable,
-                "rotationStyle": self.rotationStyle
-            })
-        
+        # add the plain target data, then either the stage or the sprite data
+        for key in _TARGET_KEYS + (_STAGE_KEYS if self.isStage else _SPRITE_KEYS):
+            baseData[key] = getattr(self, key)
 
         return baseData
 
+    def toJSON(self, indent=4):
+        """ Pretty-printed json of this target's serialized data """
+        return json.dumps(self.serialize(), indent=indent)
+
     def __repr__(self):
-        return json.dumps(self.serialize(), indent=4)
+        return f"<Target \"{self.name}\"{' (Stage)' if self.isStage else ''}>"
 
     def newBlock(self):
-        newId = self._randomBlockId()
+        newId = randomId()
         newBlock = Block(self, newId)
         self._blocks[newId] = newBlock
         return newBlock
@@ -443,32 +539,30 @@ class ScratchTarget:
     def getBlock(self, id) -> Block:
         return self._blocks.get(id, None)
 
-    def _randomBlockId(self):
-        return "".join([random.choice("1234567890abcdef") for i in range(16)])
-
 
 class ScratchProject:
     def __init__(self, projectFile):
         if not projectFile.endswith(".sb3"):
             raise Exception("Invalid file type")
 
-        dir = TEMPDIR+remove_ext(projectFile)
-        with zipfile.ZipFile(projectFile, 'r') as zip:
-            zip.extractall(dir)
-
-        self.dir = dir
-        self.deleteDir = True  # Whether to delete the working directory when __exit__ is called
+        # everything is read straight out of the archive, so nothing gets extracted to disk
+        self.dir = None
+        self.deleteDir = True  # Whether to delete the working directory (if there is one) when __exit__ is called
         self.projectFile = projectFile
         self.assets: list = []
-        for assetPath in glob(dir+"/*"):
-            if assetPath.endswith(".json"):  # Skip the project.json file
-                continue
+        self._projectData = None  # JSON-parsed contents of the project.json file
+        with zipfile.ZipFile(projectFile, 'r') as zip:
+            for info in zip.infolist():
+                if info.is_dir():
+                    continue
 
-            self.assets.append(ScratchAsset(assetPath))
+                if info.filename == "project.json":
+                    self._projectData = _loadJSON(zip.read(info))
+                elif not info.filename.endswith(".json"):
+                    self.assets.append(ScratchAsset.fromArchive(projectFile, info))
 
-        self._projectData = None  # JSON-parsed contents of the project.json file
-        with open(dir+"/"+"project.json") as projectFile:
-            self._projectData = json.load(projectFile)
+        if self._projectData is None:
+            raise Exception(f'"{projectFile}" has no project.json')
 
         # parse information out of self._rawProjectData
 
@@ -478,6 +572,11 @@ class ScratchProject:
             target.proj = self
             self.targets.append(target)
 
+        self._stage = next((target for target in self.targets if target.isStage), None)
+        self._targetsByName = {}
+        for target in self.targets:
+            self._targetsByName.setdefault(target.name, target)
+
         self.monitors = self._projectData["monitors"]
         self.extensions = self._projectData["extensions"]
         self.meta = self._projectData["meta"]
@@ -494,9 +593,7 @@ class ScratchProject:
 
     # return the stage target if it exists
     def getStage(self):
-        for target in self.targets:
-            if target.isStage:
-                return target
+        return self._stage
 
     # Read an sb3 file and output a project.json file, don't extract any asset files or return a ScratchProject instance
     @staticmethod
@@ -504,35 +601,25 @@ class ScratchProject:
         if not fl.endswith(".sb3"):
             raise Exception("Invalid file type")
 
-        # we actually do end up extracting all the files but shhhh we delete them afterwards
-        tmpOutputDir = TEMPDIR+remove_ext(fl)
         with zipfile.ZipFile(fl, 'r') as zip:
-            zip.extractall(tmpOutputDir)
-
-        with open(output, 'w') as outfl:
-            with open(tmpOutputDir+"/project.json") as fl:
-                outfl.write(fl.read())
+            data = zip.read("project.json")
 
-        shutil.rmtree(tmpOutputDir)
+        with open(output, 'wb') as outfl:
+            outfl.write(data)
 
     # Patch a string into a existing sb3 file's project.json, overwriting any existing contents
     @staticmethod
     def patchCode(data, projectFile):
-        tmpOutputDir = TEMPDIR+remove_ext(projectFile)
-        with zipfile.ZipFile(projectFile, 'r') as zip:
-            zip.extractall(tmpOutputDir)
-
-        with open(tmpOutputDir+"/project.json", 'w') as patchedFile:
-            patchedFile.write(data)
+        # copy every other member into a new archive, then swap it in for the old one
+        patchedFile = projectFile+".tmp"
+        with zipfile.ZipFile(projectFile, 'r') as src, zipfile.ZipFile(patchedFile, 'w', zipfile.ZIP_DEFLATED) as dst:
+            for info in src.infolist():
+                if info.filename != "project.json":
+                    dst.writestr(info, src.read(info))
 
-        # remove the old sb3 file
-        os.remove(projectFile)
-        # make zip file
-        shutil.make_archive(remove_ext(projectFile), 'zip', tmpOutputDir)
-        # make archive will put the extension .zip on the end; remove it
-        os.rename(remove_ext(projectFile)+'.zip', projectFile)
+            dst.writestr("project.json", data)
 
-        shutil.rmtree(tmpOutputDir)
+        os.replace(patchedFile, projectFile)
 
     # Patch a new project.json into an existing sb3 file's project.json
     @staticmethod
@@ -542,99 +629,84 @@ class ScratchProject:
 
     # Save the current ScratchProject instance to an sb3 file
     def saveToFile(self, destination, verbose=False, removeTemporary=True, prettyProjectJSON=False):
-        # make a directory to write all our files to before compressing it
-        cwd = TEMPDIR+"/_saving"  # current working directory for our archive
-
-        if os.path.isdir(cwd):  # if the save directory already exists, delete it
-            shutil.rmtree(cwd)
-
-        os.mkdir(cwd)
-
-        # save assets to folder
-
-        for asset in self.assets:
-            if verbose:
-                print("Saving file", asset.name, "...")
-
-            with open(cwd+"/"+asset.name, "wb") as fl:
-                fl.write(asset.data)
+        # everything is written straight into the archive, so removeTemporary is kept only for compatibility
+        outputData = self.serialize()
 
-        # save project.json
+        if prettyProjectJSON:
+            projectJSON = json.dumps(outputData, indent=4, sort_keys=True)
+        elif orjson:
+            projectJSON = orjson.dumps(outputData)
+        else:
+            projectJSON = json.dumps(outputData)
 
-        outputData = self.serialize()
+        # assets may still be read out of the original sb3, so write to a temporary file in case that's the destination
+        tmpDestination = destination+".tmp"
+        sourceArchives = {} # each source sb3 is opened once and shared by all of its assets
+        try:
+            with zipfile.ZipFile(tmpDestination, 'w', zipfile.ZIP_DEFLATED) as zip:
+                for asset in self.assets:
+                    if verbose:
+                        print("Saving file", asset.name, "...")
 
-        with open(cwd+"/project.json", "w") as fl:
-            if prettyProjectJSON:
-                json.dump(outputData, fl, indent=4, sort_keys=True)
-            else:
-                json.dump(outputData, fl)
+                    asset.writeToArchive(zip, sourceArchives)
 
-        # make zip file
-        shutil.make_archive(destination, 'zip', cwd)
-        # make archive will put the extension .zip on the end; remove it
-        os.rename(destination+'.zip', destination)
+                zip.writestr("project.json", projectJSON)
+        finally:
+            for src in sourceArchives.values():
+                src.close()
 
-        # clean up
-        if removeTemporary:
-            shutil.rmtree(cwd)
+        os.replace(tmpDestination, destination)
     
     def getTarget(self, name):
-        for target in self.targets:
-            if target.name == name:
-                return target
+        return self._targetsByName.get(name)
 
     def __enter__(self):
         return self
 
     def __exit__(self, *args):
-        if self.deleteDir:
+        if self.deleteDir and self.dir is not None:
             shutil.rmtree(self.dir)
 
     def __repr__(self):
-        return f'<ScratchProject dir="{self.dir}">'
+        return f'<ScratchProject "{self.projectFile}">'
 
 class Util:
     @staticmethod
     def dumpProjectContents(project: ScratchProject):
-        s = ""
+        out = []
 
-        s+=f"=== Scratch Project \"{project.projectFile}\" ===\n"
-        s+="\n"
+        out.append(f"=== Scratch Project \"{project.projectFile}\" ===\n")
+        out.append("\n")
         
         # collect stats
         numStages = len(project.targets)
-        numBlocks = 0
-        for t in project.targets:
-            for b in t._blocks.values():
-                numBlocks+=1
+        numBlocks = sum(len(t._blocks) for t in project.targets)
 
-        s+=f"Stats: {numStages} stages, {numBlocks} blocks\n"
-        s+="\n"
+        out.append(f"Stats: {numStages} stages, {numBlocks} blocks\n")
+        out.append("\n")
 
         indent = "    "
+        i1, i2, i3 = indent, indent*2, indent*3
         # display targets
         for target in project.targets:
-            s+=f"\"{target.name}\" "+("(Stage):\n" if target.isStage else "(Sprite):\n")
-            s+=indent+"variables:\n"
+            out.append(f"\"{target.name}\" "+("(Stage):\n" if target.isStage else "(Sprite):\n"))
+            out.append(i1+"variables:\n")
             for var in target.getVariables():
-                s+=indent*2+f"{var.name} (id: \"{var.id}\")\n"
-            s+=indent+"lists:\n"
+                out.append(i2+f"{var.name} (id: \"{var.id}\")\n")
+            out.append(i1+"lists:\n")
             for var in target.getLists():
-                s+=indent*2+f"{var.name} (id: \"{var.id}\")\n"
+                out.append(i2+f"{var.name} (id: \"{var.id}\")\n")
 
             for block in target.getBlocks():
-                s+=indent+"Block "+block.opcode+":\n"
-                s+=indent*2+"fields:\n"
-                for field in block.fields:
-                    s+=indent*3+str(field)+"\n"
-                s+=indent*2+"inputs:\n"
-                for input in block.inputs:
-                    s+=indent*3+str(input)+"\n"
+                out.append(i1+"Block "+block.opcode+":\n")
+                out.append(i2+"fields:\n")
+                for field in block.fields.values():
+                    out.append(i3+str(field)+"\n")
+                out.append(i2+"inputs:\n")
+                for input in block.inputs.values():
+                    out.append(i3+str(input)+"\n")
                 if nextBlock := block.getNextBlock():
-                    s+=indent*2+"next: "+nextBlock.opcode+"\n"
-            s+="\n"
+                    out.append(i2+"next: "+nextBlock.opcode+"\n")
+            out.append("\n")
         
-        return s
-
-
-        
\ No newline at end of file
+        return "".join(out)
@@ -267,7 +267,6 @@ class SPModuleParser:
         if line.startswith("def "): # it's a function definition, so we can parse it as python
             funcDefNode = ast.parse(line+" pass").body[0]   # add a function body stub to the parser argument so python
                                                             # doesn't get mad that we have an incomplete function definition
-            print(ast.dump(funcDefNode))
             functionName = funcDefNode.name
             functionArgNodes = funcDefNode.args.args
 
@@ -378,7 +377,6 @@ class SPModuleParser:
         # STATEMENT_WHILE = 4
         # STATEMENT_BREAK = 5
         # STATEMENT_RETURN = 6
-        print(ast.dump(node))
         if type(node)==ast.Assign:
             param_leftHand = []
             param_rightHand = None
@@ -5,7 +5,8 @@ import ast
 import random
 
 def randomId(size=16):
-    return "".join([random.choice("1234567890abcdef") for i in range(size)])
+    # [size] random hex digits, generated all at once
+    return f"{random.getrandbits(size*4):0{size}x}"
 
 class ParsingError(Exception):pass 
 
@@ -17,9 +18,9 @@ class SPVariable:
         return f'<Variable "{self.name}" initialValue={repr(self.value)}>'
 
 class SPList:
-    def __init__(self, name, initialValue=[]):
+    def __init__(self, name, initialValue=None):
         self.name = name
-        self.value = initialValue
+        self.value = [] if initialValue is None else initialValue
     
     def __repr__(self):
         return f'<List "{self.name}" initialValue={repr(self.value)}>'
@@ -71,6 +72,7 @@ class SPModule:
         self.imports = []
 
         self.functionBlocks: list[SPFunctionDefinition] = []
+        self._functions: dict[str, SPFunctionDefinition] = {} # functionBlocks by name
         self.broadcasts = []
         self.eventBlocks = []
 
@@ -91,6 +93,10 @@ class SPModule:
     
     def getList(self, name):
         return self._lists[name]
+
+    def addFunctionBlock(self, function: SPFunctionDefinition):
+        self.functionBlocks.append(function)
+        self._functions[function.fname] = function
                 
     def findSymbolType(self, name):
         if name in self._variables:
@@ -99,9 +105,8 @@ class SPModule:
         if name in self._lists:
             return "list"
 
-        for v in self.functionBlocks:
-            if v.fname == name:
-                return "function"
+        if name in self._functions:
+            return "function"
     
     def hasSymbolWithName(self, name):
         return self.findSymbolType(name) != None
@@ -109,97 +114,101 @@ class SPModule:
 """ ScratchPy AST Objects """
 
 class SPNode:
-    def __init__(self):
-        self._publicProperties = []
+    # nodes get made for every statement and expression, so they use __slots__; a node's slots are its public properties
+    __slots__ = ()
 
     def getChildren(self):
         return []
     
     def _dumpProperties(self):
-        return " ".join([f'{prop}={repr(self.__dict__[prop])}' for prop in self._publicProperties])
+        return " ".join([f'{prop}={repr(getattr(self, prop))}' for prop in self.__slots__])
 
     def __repr__(self):
         return f'<{type(self).__name__} {self._dumpProperties()}>'
 
 class SPConstant(SPNode):
+    __slots__ = ("value",)
+
     def __init__(self, value):
         super().__init__()
         self.value = value
-        self._publicProperties = ["value"]
     
     def getChildren(self):
         return []
 
 class SPReturn(SPNode):
+    __slots__ = ("value",)
+
     def __init__(self, value):
         super().__init__()
         self.value = value
-        self._publicProperties = ["value"]
     
     def getChildren(self):
         return [self.value]
 
 # AST reference to a variable
 class SPVariableName(SPNode):
+    __slots__ = ("variableName",)
+
     def __init__(self, var: SPVariable):
         super().__init__()
         self.variableName = var.name
 
-        self._publicProperties = ["variableName"]
-
 # AST reference to a list
 class SPListName(SPNode):
+    __slots__ = ("listName",)
+
     def __init__(self, list: SPVariable):
         super().__init__()
         self.listName = list.name
 
-        self._publicProperties = ["variableName"]
-
 # AST reference to a function
 class SPFunctionName(SPNode):
+    __slots__ = ("fname",)
+
     def __init__(self, fname):
         super().__init__()
         self.fname = fname
 
-        self._publicProperties = ["fname"]
-
 # AST reference to a function argument
 class SPArgumentName(SPNode):
+    __slots__ = ("argname", "function")
+
     def __init__(self, argname, function: SPFunctionDefinition):
         super().__init__()
         self.argname = argname
         self.function = function
-
-        self._publicProperties = ["argname", "function"]
     
     def getArgumentObject(self):
         return self.function.getArgument(self.argname)
 
 class SPAssign(SPNode):
+    __slots__ = ("targets", "value", "modify")
+
     def __init__(self, targets, value, modify=0):
         super().__init__()
         self.targets = targets
         self.value = value
         self.modify = modify
-
-        self._publicProperties = ["targets", "value", "modify"]
     
     def getChildren(self):
         return self.targets+[self.value]
 
 class SPExpression(SPNode):
+    __slots__ = ()
+
     def __init__(self):
         super().__init__()
 
 class SPArithmetic(SPNode):
+    __slots__ = ("left", "right", "op")
+
     def __init__(self, left, right, op):
         super().__init__()
 
         self.left = left
         self.right = right
         self.op = op
-
-        self._publicProperties = ["left", "right", "op"]
     
     def getChildren(self):
         return [self.left, self.right]
\ No newline at end of file
@@ -3,6 +3,9 @@ import json
 from . import SPArgumentName, SPArithmetic, SPAssign, SPConstant, SPFunctionDefinition, SPModule, SPNode, SPVariableName
 from .. import scratch
 
+# the built-in template, resolved once instead of on every compiler construction
+_DEFAULT_TEMPLATE_FILE = os.path.dirname(os.path.realpath(__file__))+"/resources/scratchpy_compiler_template.sb3"
+
 class CompilationContext:
     def __init__(self):
         self.enclosingFunction: SPFunctionDefinition = None
@@ -20,8 +23,7 @@ class SPModuleCompiler:
         templateTarget specifies the sprite to load the program blocks into
         """
         if templateFile == None:
-            thisPath = os.path.dirname(os.path.realpath(__file__))
-            templateFile = thisPath+"/resources/scratchpy_compiler_template.sb3"
+            templateFile = _DEFAULT_TEMPLATE_FILE
             templateTarget = "__main__"
         
         self.templateFile = templateFile
@@ -61,7 +63,7 @@ class SPModuleCompiler:
             protoBlock.shadow = True
             
             # Link prototype block to function def block
-            defBlock.inputs.append(scratch.BlockInput("custom_block", 1, protoBlock.id))
+            defBlock.addInput(scratch.BlockInput("custom_block", 1, protoBlock.id))
             
             # Create argument ids
             argIds = []
@@ -97,9 +99,9 @@ class SPModuleCompiler:
                 reporter = codeTarget.createBlock(parent=protoBlock)
                 reporter.opcode = "argument_reporter_string_number"
 
-                reporter.fields.append(scratch.BlockField("VALUE", [arg.name, None]))
+                reporter.addField(scratch.BlockField("VALUE", [arg.name, None]))
 
-                protoBlock.inputs.append(scratch.BlockInput(arg.id, 1, reporter.id))
+                protoBlock.addInput(scratch.BlockInput(arg.id, 1, reporter.id))
 
             # compile the body of the function
             prevNode = defBlock
@@ -116,7 +118,7 @@ class SPModuleCompiler:
         if type(node) == SPArgumentName:
             reporter = target.createBlock()
             reporter.opcode = "argument_reporter_string_number"
-            reporter.fields.append(scratch.BlockField("VALUE", [node.argname, None]))
+            reporter.addField(scratch.BlockField("VALUE", [node.argname, None]))
             return scratch.BlockInput(name, 1, reporter.id)
         if type(node) == SPVariableName:
             var = target.findVariableByName(node.variableName)
@@ -144,11 +146,8 @@ class SPModuleCompiler:
 
             rightInput = self._spNodeToBlockInput("NUM2", target, node=node.right)
 
-            leftInput.parentId = block
-            rightInput.parentId = block
-
-            block.inputs.append(leftInput)
-            block.inputs.append(rightInput)
+            block.addInput(leftInput)
+            block.addInput(rightInput)
 
         else:
             print(f'Compilation warning: unsupported node type "{type(node).__name__}" for reporter')
@@ -161,14 +160,14 @@ class SPModuleCompiler:
             for assignTarget in node.targets:
                 block = target.createBlock()
                 block.opcode = "data_setvariableto"
-                block.fields.append(scratch.BlockField("VARIABLE", [
+                block.addField(scratch.BlockField("VARIABLE", [
                     assignTarget.variableName,
                     target.findVariableByName(assignTarget.variableName).id
                 ]))
 
                 assignValueBlock = self.spNodeToReporterBlock(target, node.value)
 
-                block.inputs.append(scratch.BlockInput("VALUE", 1, assignValueBlock.id))
+                block.addInput(scratch.BlockInput("VALUE", 1, assignValueBlock.id))
                 blocks.append(block)
         else:
             print(f'Compilation warning: unsupported node type "{type(node).__name__}"')
@@ -4,21 +4,33 @@ from . import SPArgumentName, SPArithmetic, SPAssign, SPConstant, SPFunctionDefi
 from .. import scratch
 from . import spil
 
+# the built-in template, resolved once instead of on every compiler construction
+_DEFAULT_TEMPLATE_FILE = os.path.dirname(os.path.realpath(__file__))+"/resources/scratchpy_compiler_template.sb3"
+
 class CompilationContext:
     def __init__(self):
         self.nextAvailableTmp = 4
+        self.freeTemporaries: list[str] = [] # temporaries that were released and can be handed out again
         self.currentBroadcast: spil.Broadcast = None
         self.enclosingFunction: SPFunctionDefinition = None
 
     def reserveTemporary(self):
+        if self.freeTemporaries:
+            return self.freeTemporaries.pop()
+
         tmp = "__tmp"+str(self.nextAvailableTmp)
         self.nextAvailableTmp += 1
         if self.nextAvailableTmp == 125:
             raise Exception("Temporary variable limit exceeded")
         return tmp
 
+    def releaseTemporary(self, tmp):
+        """ Mark a temporary as no longer in use, so it can be reused by the rest of the statement """
+        self.freeTemporaries.append(tmp)
+
     def resetUsedTemporary(self):
         self.nextAvailableTmp = 4
+        self.freeTemporaries.clear()
 
 class SPModuleCompiler:
     def __init__(self, module: SPModule, templateFile=None):
@@ -28,8 +40,7 @@ class SPModuleCompiler:
         compiler to finally create a scratch program.
         """
         if templateFile == None:
-            thisPath = os.path.dirname(os.path.realpath(__file__))
-            templateFile = thisPath+"/resources/scratchpy_compiler_template.sb3"
+            templateFile = _DEFAULT_TEMPLATE_FILE
         
         self.templateFile = templateFile
         self.module = module
@@ -43,44 +54,67 @@ class SPModuleCompiler:
     def addInstruction(self, inst: spil.Instruction):
         self.context.currentBroadcast.body.append(inst)
     
+    def _compileVariableName(self, node: SPVariableName):
+        tmp = self.context.reserveTemporary()
+        self.addInstruction(spil.Copy(tmp, node.variableName))
+        return tmp
+
+    def _compileArgumentName(self, node: SPArgumentName):
+        tmp = self.context.reserveTemporary()
+        argVar = self.nameMangleArgument(node.argname, self.context.enclosingFunction)
+        self.addInstruction(spil.Copy(tmp, argVar))
+        return tmp
+
+    def _compileConstant(self, node: SPConstant):
+        tmp = self.context.reserveTemporary()
+        self.addInstruction(spil.Load(tmp, node.value))
+        return tmp
+
+    # SPArithmetic ops and the SPIL instructions they compile to [op : instruction]
+    _arithmeticInstructions = {
+        "add": spil.Add,
+        "sub": spil.Sub,
+        "mul": spil.Mul,
+        "div": spil.Div
+    }
+
+    def _compileArithmetic(self, node: SPArithmetic):
+        tmpL = self.compileExpression(node.left)
+        tmpR = self.compileExpression(node.right)
+
+        instruction = self._arithmeticInstructions.get(node.op)
+        if instruction is None:
+            raise Exception(f'Unsupported arithmetic operation "{node.op}"')
+
+        self.addInstruction(instruction(tmpL, tmpR))
+
+        # the result lives in tmpL, so tmpR is free again
+        self.context.releaseTemporary(tmpR)
+        return tmpL
+
+    # How to compile each kind of expression node [node type : handler]
+    _expressionCompilers = {
+        SPVariableName: _compileVariableName,
+        SPArgumentName: _compileArgumentName,
+        SPConstant: _compileConstant,
+        SPArithmetic: _compileArithmetic
+    }
+
     def compileExpression(self, node: SPNode):
         """ Compile a SP Expression into SPIL instructions. Returns variable in which the result of the expresion is stored """
-        if type(node) == SPVariableName:
-            tmp = self.context.reserveTemporary()
-            self.addInstruction(spil.Copy(tmp, node.variableName))
-            return tmp
-        elif type(node) == SPArgumentName:
-            tmp = self.context.reserveTemporary()
-            argVar = self.nameMangleArgument(node.argname, self.context.enclosingFunction)
-            self.addInstruction(spil.Copy(tmp, argVar))
-            return tmp
-        elif type(node) == SPConstant:
-            tmp = self.context.reserveTemporary()
-            self.addInstruction(spil.Load(tmp, node.value))
-            return tmp
+        handler = self._expressionCompilers.get(type(node))
+
+        if handler is not None:
+            return handler(self, node)
         
-        elif type(node) == SPArithmetic:
-            tmpL = self.compileExpression(node.left)
-            tmpR = self.compileExpression(node.right)
-
-            if node.op=="add":
-                self.addInstruction(spil.Add(tmpL, tmpR))
-            if node.op=="sub":
-                self.addInstruction(spil.Sub(tmpL, tmpR))
-            if node.op=="mul":
-                self.addInstruction(spil.Mul(tmpL, tmpR))
-            if node.op=="div":
-                self.addInstruction(spil.Div(tmpL, tmpR))
-
-            return tmpL
-        else:
-            print(f'Unsupported SP node type in expression: {type(node).__name__}')
+        print(f'Unsupported SP node type in expression: {type(node).__name__}')
 
     def compileAssignNode(self, node: SPAssign):
         for assignTargetNode in node.targets:
             assignTarget = assignTargetNode.variableName
             assignVal = self.compileExpression(node.value)
             self.addInstruction(spil.Copy(assignTarget, assignVal))
+            self.context.releaseTemporary(assignVal)
     
     def compileReturnNode(self, node: SPReturn):
         exprVariable = self.compileExpression(node.value)
@@ -91,7 +125,14 @@ class SPModuleCompiler:
             self.addInstruction(spil.Pop(argVar))
 
         self.addInstruction(spil.Copy(retVariable, exprVariable))
+        self.context.releaseTemporary(exprVariable)
     
+    # How to compile each kind of statement node [node type : handler]
+    _statementCompilers = {
+        SPAssign: compileAssignNode,
+        SPReturn: compileReturnNode
+    }
+
     def nameMangleArgument(self, argName, function: SPFunctionDefinition):
         return f"_{function.fname}_arg_{argName}"
     
@@ -124,10 +165,10 @@ class SPModuleCompiler:
             # compile function body into broadcast
 
             for node in function.body:
-                if type(node) == SPAssign:
-                    self.compileAssignNode(node)
-                elif type(node) == SPReturn:
-                    self.compileReturnNode(node)
+                handler = self._statementCompilers.get(type(node))
+
+                if handler is not None:
+                    handler(self, node)
                 else:
                     print(f'Unsupported SP node type in statement: {type(node).__name__}')
 
@@ -4,6 +4,22 @@ from . import SPContainer, SPModule, SPFunctionDefinition, SPFunctionArgument, P
 from .python_ast import PyASTProcessor
 import ast
 import re
+import copy
+import functools
+
+# matches the indentation at the start of a line
+_LEADING_WHITESPACE_RE = re.compile(r'^\s+')
+
+@functools.lru_cache(maxsize=1024)
+def _literalEval(expr):
+    # initializers like "0" or "[]" tend to repeat, so remember what they evaluate to.
+    # errors aren't cached, they just propagate to the caller
+    return ast.literal_eval(expr)
+
+@functools.lru_cache(maxsize=4096)
+def _parseStatement(line):
+    # the same statement text always parses to the same node; the nodes are only ever read, so sharing them is fine
+    return ast.parse(line).body[0]
 
 
 class SPModuleParser:
@@ -32,26 +48,23 @@ class SPModuleParser:
         if critical:
             raise ParsingError("An error occurred while parsing")
     
-    def _isCharEnclosed(self, charIndex, string):
-        """ Return true if the character at charIndex is enclosed in double quotes (a string) """
-        numQuotes = 0  # if the number of quotes past this character is odd, than this character lies inside a string
-        for i in range(charIndex, len(string)):
-            if string[i] == '"':
-                numQuotes += 1
-
-        return numQuotes % 2 == 1
-
     def _removeComments(self, line):
         """ return [line] with any comments removed """
-        if not "#" in line:
-            return line
+        if not '"' in line:
+            # no strings for a # to hide in, so everything after the first one is a comment
+            return line.partition("#")[0]
 
-        # Find the first instance of a # character that isn't enclosed inside a string
+        # Find the first instance of a # character that isn't enclosed inside a string,
+        # keeping track of whether we're in a string as we go
+        inString = False
 
         for i, c in enumerate(line):
-            if c == "#":
-                if not self._isCharEnclosed(i, line):
-                    return line[:i]
+            if c == '"':
+                inString = not inString
+            elif c == "#" and not inString:
+                return line[:i]
+
+        return line
     
     def _isValidName(self, name):
         """
@@ -59,14 +72,8 @@ class SPModuleParser:
         and underscores
         """
 
-        if name[0] in "1234567890":
-            return False
-        
-        for c in name:
-            if not c in "abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ1234567890_":
-                return False
-        
-        return True
+        # an ascii python identifier follows exactly these rules
+        return name.isascii() and name.isidentifier()
 
     def _astParseExpr(self, expr):
         """ Parse expression using python's ast module. creates an error on the current line if there was a syntax error """
@@ -81,8 +88,8 @@ class SPModuleParser:
         """ Parse constant expression using python's ast module. creates an error on the current line if there was a syntax error """
        
         try:
-            value = ast.literal_eval(expr)
-            return value
+            # copy so containers like "[]" aren't shared between definitions (constants come back as-is)
+            return copy.deepcopy(_literalEval(expr))
         except ValueError as e:
             self.throwError("Unsupported operation in constant expression", critical=False)
         except SyntaxError:
@@ -121,12 +128,12 @@ class SPModuleParser:
         # such as a function definition or event handler
 
         # find indentation of subsequent line, if it's zero than we have a problem
-        leadingWhitespace = re.findall(r'^\s+', self.getLineByNumber(self.currentLine+1))
+        leadingWhitespace = _LEADING_WHITESPACE_RE.match(self.getLineByNumber(self.currentLine+1))
 
         if not leadingWhitespace:
             self.throwError("Missing code block definition", lineNumber=self.currentLine+1)
             
-        leadingWhitespace = leadingWhitespace[0] # get first (and only) match
+        leadingWhitespace = leadingWhitespace.group()
 
         # we need to package the subsequent code block into an SPContainer
         # and add it to the module. First, let's figure out what kind of container this is
@@ -169,34 +176,32 @@ class SPModuleParser:
 
         # ok now parse the subsequent indented lines into the container object
 
-        containerBody = []
+        bodyLines = [] # dedented body lines, None for blank ones
 
         lineStart = self.currentLine
         lineNum = self.currentLine+1 # begin parsing into the next block
 
-        while lineNum <= self.lastLineNumber():
-            _line = self.getLineByNumber(lineNum)
-            _leadingWhitespace = re.findall(r'^\s+', _line)
+        lines = self._parsingSource
+        lastLineNumber = len(lines)
+        while lineNum <= lastLineNumber:
+            _line = lines[lineNum-1]
+            _leadingWhitespace = _LEADING_WHITESPACE_RE.match(_line)
 
             if not _line.strip(): # if line is empty, skip it and continue
                 lineNum+=1
-                containerBody.append(None) # add blank line so the line numbers stay synced
+                bodyLines.append(None) # add blank line so the line numbers stay synced
                 continue
 
             if not _leadingWhitespace: # stop once we reach a non-indented block
                 break
 
             # remove block indentation from line
-            _line = _line[len(_leadingWhitespace[0]):]
+            _line = _line[_leadingWhitespace.end():]
 
             if _line.endswith(":"):
                 _line += " pass"
             
-            try:
-                containerBody.append(ast.parse(_line).body[0])
-            except SyntaxError: # did the python parser throw a hissy fit
-                self.throwError("Syntax error", critical=False, lineNumber=lineNum)
-                containerBody.append(None)  # add blank line so the line numbers stay synced
+            bodyLines.append(_line)
             lineNum+=1
         
         self.currentLine = lineNum-1 # skip the lines we just parsed
@@ -204,11 +209,41 @@ class SPModuleParser:
         
         # don't worry about container being None, if the container type was unable
         # to be determined by this point, a critical error would have been thrown already
-        container.pythonBody = containerBody
+        container.pythonBody = self._parseContainerBody(bodyLines, lineStart)
         container.lineStart = lineStart
 
         if type(container) == SPFunctionDefinition:
-            self.module.functionBlocks.append(container)
+            self.module.addFunctionBlock(container)
+
+    def _parseContainerBody(self, bodyLines, lineStart):
+        """ Parse each line of a container body into a python ast node (None for blank lines and lines with syntax errors) """
+
+        # every line is its own statement, so normally the whole body can go through the python parser in one call.
+        # that only works if each line comes out as exactly one statement that starts and ends on it
+        try:
+            statements = ast.parse("\n".join(line or "" for line in bodyLines)).body
+        except SyntaxError:
+            statements = None
+
+        if statements is not None and len(statements) == len(bodyLines)-bodyLines.count(None):
+            nodesByLine = {node.lineno: node for node in statements if node.end_lineno == node.lineno}
+
+            if len(nodesByLine) == len(statements):
+                return [nodesByLine[i] if line is not None else None for i, line in enumerate(bodyLines, 1)]
+
+        # otherwise parse line by line, so the errors end up on the right lines
+        return [self._parseBodyLine(line, lineNum) for lineNum, line in enumerate(bodyLines, lineStart+1)]
+
+    def _parseBodyLine(self, line, lineNum):
+        """ Parse a single container body line; None for blank lines and lines with syntax errors, so the line numbers stay synced """
+        if line is None:
+            return None
+
+        try:
+            return _parseStatement(line)
+        except SyntaxError: # did the python parser throw a hissy fit
+            self.throwError("Syntax error", critical=False, lineNumber=lineNum)
+            return None
 
     def _parseTopLevelLine(self, line: str):
         line = self._removeComments(line).rstrip() # remove comments and trailing whitespace 
@@ -216,10 +251,11 @@ class SPModuleParser:
         if line == "":
             return
         # enforce indentation (top-level lines cannot be indented)
-        if line.lstrip() != line:
+        if line[0].isspace():
             self.throwError("Indentation error")
         
-        if line.startswith("var ") or line.startswith("list "):
+        keyword, space, _ = line.partition(" ")
+        if space and (keyword == "var" or keyword == "list"):
             """ Variable/list definition """
 
             self._parseVariableOrListDefinition(line)
@@ -250,10 +286,12 @@ class SPModuleParser:
     def _parseText(self, text):
         self.currentLine = 1
 
-        # Parse top-level lines
-        while self.currentLine <= self.lastLineNumber():
-            line = self.getLineByNumber(self.currentLine)
-            self._parseTopLevelLine(line)
+        # Parse top-level lines. self.currentLine is kept up to date since it's used for error reporting,
+        # and container definitions move it past their bodies
+        lines = self._parsingSource
+        lastLineNumber = len(lines)
+        while self.currentLine <= lastLineNumber:
+            self._parseTopLevelLine(lines[self.currentLine-1])
             self.currentLine+=1
         
         # Process container bodies
@@ -95,6 +95,32 @@ class PyASTProcessor:
         self.addError(f'You shouldn\'t be seeing this error lol')
         return None
 
+    # Symbol types that can be assigned to, and the SP node for each [symbol type : node constructor]
+    _assignTargetNodes = {
+        "variable": lambda self, name: SPVariableName(self.module.getVariable(name)),
+        "list": lambda self, name: SPListName(self.module.getList(name))
+    }
+
+    def _processAssignTarget(self, symbolName, rightHandNode):
+        """ Make the SP node for one left-hand target of an assignment, or add an error and return None """
+        symbolType = self.module.findSymbolType(symbolName)
+
+        if symbolType == None:
+            self.addError(f'Undefined symbol "{symbolName}"')
+        
+        # can only reassign list variable to a list literal
+        if symbolType == "list" and type(rightHandNode) != ast.List:
+            self.addError(f'Cannot assign non-list literal to list variable')
+
+        # Check to make sure that we're assigning to a variable or list
+        makeNode = self._assignTargetNodes.get(symbolType)
+
+        if makeNode is None:
+            self.addError(f'Cannot assign to symbol of type "{symbolType}"')
+            return None
+        
+        return makeNode(self, symbolName)
+
     def processAssignNode(self, node: Union[ast.Assign,ast.AugAssign]):
         targets = []
         value = None
@@ -107,22 +133,9 @@ class PyASTProcessor:
                 self.addError(f'Left-hand of assignment operator must be a name constant or list index')
                 return
             
-            symbolName = leftHandAssignment.id
-            symbolType = self.module.findSymbolType(symbolName)
-
-            if symbolType == None:
-                self.addError(f'Undefined symbol "{symbolName}"')
-            
-            # Check to make sure that we're assigning to a variable or list
-            if symbolType == "variable":
-                targets.append(SPVariableName(self.module.getVariable(symbolName)))
-            elif symbolType == "list":
-                # can only reassign list variable to a list literal
-                if type(rightHandNode) != ast.List:
-                    self.addError(f'Cannot assign non-list literal to list variable')
-                targets.append(SPListName(self.module.getList(symbolName)))
-            else:
-                self.addError(f'Cannot assign to symbol of type "{symbolType}"')
+            target = self._processAssignTarget(leftHandAssignment.id, rightHandNode)
+            if target is not None:
+                targets.append(target)
         
         # Process right hand value of assignment operator
 
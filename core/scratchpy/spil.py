@@ -171,8 +171,8 @@ class Load(Instruction):
     def convertToBlocks(self, target: scratch.ScratchTarget):
         block = target.createBlock()
         block.opcode = "data_setvariableto"
-        block.inputs = [makeValueInput(target, "VALUE", self.value)]
-        block.fields = [makeVariableField(target, "VARIABLE", self.dest)]
+        block.setInputs(makeValueInput(target, "VALUE", self.value))
+        block.setFields(makeVariableField(target, "VARIABLE", self.dest))
         return [block]
 
 
@@ -184,8 +184,8 @@ class Copy(Instruction):
     def convertToBlocks(self, target: scratch.ScratchTarget):
         block = target.createBlock()
         block.opcode = "data_setvariableto"
-        block.inputs = [makeVariableInput(target, "VALUE", self.value)]
-        block.fields = [makeVariableField(target, "VARIABLE", self.dest)]
+        block.setInputs(makeVariableInput(target, "VALUE", self.value))
+        block.setFields(makeVariableField(target, "VARIABLE", self.dest))
         return [block]
 
 
@@ -199,19 +199,19 @@ class BinaryBooleanOperation(Instruction):
     def convertToBlocks(self, target: scratch.ScratchTarget):
         assignBlock = target.createBlock()
         assignBlock.opcode = "data_setvariableto"
-        assignBlock.fields = [makeVariableField(target, "VARIABLE", self.dest)]
+        assignBlock.setFields(makeVariableField(target, "VARIABLE", self.dest))
 
         boolBlock = target.createBlock(parent=assignBlock)
         boolBlock.opcode = self.opcode
-        boolBlock.inputs = [
+        boolBlock.setInputs(
             makeVariableInput(target, inputName="OPERAND1", varName=self.y),
             makeVariableInput(target, inputName="OPERAND2", varName=self.x)
-        ]
+        )
 
-        assignBlock.inputs = [
+        assignBlock.setInputs(
             makeReporterInput(target, inputName="VALUE",
                               reporter=boolBlock)
-        ]
+        )
 
         return [assignBlock]
 
@@ -225,19 +225,19 @@ class BinaryArithmeticOperation(Instruction):
     def convertToBlocks(self, target: scratch.ScratchTarget):
         assignBlock = target.createBlock()
         assignBlock.opcode = "data_setvariableto"
-        assignBlock.fields = [makeVariableField(target, "VARIABLE", self.dest)]
+        assignBlock.setFields(makeVariableField(target, "VARIABLE", self.dest))
 
         arithmeticBlock = target.createBlock(parent=assignBlock)
         arithmeticBlock.opcode = self.opcode
-        arithmeticBlock.inputs = [
+        arithmeticBlock.setInputs(
             makeVariableInput(target, inputName="NUM1", varName=self.dest),
             makeVariableInput(target, inputName="NUM2", varName=self.x)
-        ]
+        )
 
-        assignBlock.inputs = [
+        assignBlock.setInputs(
             makeReporterInput(target, inputName="VALUE",
                               reporter=arithmeticBlock)
-        ]
+        )
 
         return [assignBlock]
 
@@ -295,17 +295,17 @@ class Get(Instruction):
         reporterBlock = target.createBlock(parent=assignBlock)
         indexBlock = target.createBlock(parent=reporterBlock)
         indexBlock.opcode = "operator_add"
-        indexBlock.inputs = [
+        indexBlock.setInputs(
             makeVariableInput(target, "NUM1", self.i),
             makeValueInput(target, "NUM2", 1)
-        ]
+        )
 
         reporterBlock.opcode = "data_itemoflist"
-        reporterBlock.inputs = [makeReporterInput(target, "INDEX", indexBlock)]
-        reporterBlock.fields = [makeListField(target, "LIST", self.list)]
+        reporterBlock.setInputs(makeReporterInput(target, "INDEX", indexBlock))
+        reporterBlock.setFields(makeListField(target, "LIST", self.list))
 
-        assignBlock.inputs = [makeReporterInput(target, "VALUE", reporterBlock)]
-        assignBlock.fields = [makeVariableField(target, "VARIABLE", self.dest)]
+        assignBlock.setInputs(makeReporterInput(target, "VALUE", reporterBlock))
+        assignBlock.setFields(makeVariableField(target, "VARIABLE", self.dest))
         return [assignBlock]
 
 class Set(Instruction):
@@ -320,16 +320,16 @@ class Set(Instruction):
 
         indexBlock = target.createBlock(parent=assignBlock)
         indexBlock.opcode = "operator_add"
-        indexBlock.inputs = [
+        indexBlock.setInputs(
             makeVariableInput(target, "NUM1", self.i),
             makeValueInput(target, "NUM2", 1)
-        ]
+        )
 
-        assignBlock.inputs = [
+        assignBlock.setInputs(
             makeReporterInput(target, "INDEX", indexBlock),
             makeVariableInput(target, "ITEM", self.x)
-        ]
-        assignBlock.fields = [makeListField(target, "LIST", self.list)]
+        )
+        assignBlock.setFields(makeListField(target, "LIST", self.list))
         return [assignBlock]
 
 
@@ -341,13 +341,13 @@ class Len(Instruction):
     def convertToBlocks(self, target: scratch.ScratchTarget):
         assignBlock = target.createBlock()
         assignBlock.opcode = "data_setvariableto"
-        assignBlock.fields = [makeVariableField(target, "VARIABLE", self.dest)]
+        assignBlock.setFields(makeVariableField(target, "VARIABLE", self.dest))
 
         reporterBlock = target.createBlock(parent=assignBlock)
         reporterBlock.opcode = "data_lengthoflist"
-        reporterBlock.fields = [makeListField(target, "LIST", self.list)]
+        reporterBlock.setFields(makeListField(target, "LIST", self.list))
 
-        assignBlock.inputs = [makeReporterInput(target, "VALUE", reporterBlock)]
+        assignBlock.setInputs(makeReporterInput(target, "VALUE", reporterBlock))
 
         return [assignBlock]
 
@@ -359,8 +359,8 @@ class Apd(Instruction):
     def convertToBlocks(self, target: scratch.ScratchTarget):
         block = target.createBlock()
         block.opcode = "data_addtolist"
-        block.inputs = [makeVariableInput(target, "ITEM", self.x)]
-        block.fields = [makeListField(target, "LIST", self.list)]
+        block.setInputs(makeVariableInput(target, "ITEM", self.x))
+        block.setFields(makeListField(target, "LIST", self.list))
         
         return [block]
 
@@ -376,24 +376,24 @@ class Branch(Instruction):
 
         condBlock = target.createBlock(parent=ifelseBlock)
         condBlock.opcode = "operator_equals"
-        condBlock.inputs = [
+        condBlock.setInputs(
             makeVariableInput(target, "OPERAND1", self.cond),
             makeValueInput(target, "OPERAND2", "true", type=10)
-        ]
+        )
 
         yesBlock = target.createBlock(parent=ifelseBlock)
         yesBlock.opcode = "event_broadcastandwait"
-        yesBlock.inputs = [makeBroadcastInput(target, "BROADCAST_INPUT", self.b1)]
+        yesBlock.setInputs(makeBroadcastInput(target, "BROADCAST_INPUT", self.b1))
         
         noBlock = target.createBlock(parent=ifelseBlock)
         noBlock.opcode = "event_broadcastandwait"
-        noBlock.inputs = [makeBroadcastInput(target, "BROADCAST_INPUT", self.b2)]
+        noBlock.setInputs(makeBroadcastInput(target, "BROADCAST_INPUT", self.b2))
 
-        ifelseBlock.inputs = [
+        ifelseBlock.setInputs(
             makeReporterInput(target, "CONDITION", condBlock),
             makeBlockInput(target, "SUBSTACK", yesBlock),
             makeBlockInput(target, "SUBSTACK2", noBlock)
-        ]
+        )
 
         return [ifelseBlock]
 
@@ -403,7 +403,7 @@ class Jump(Instruction):
     def convertToBlocks(self, target: scratch.ScratchTarget):
         block = target.createBlock()
         block.opcode = "event_broadcastandwait"
-        block.inputs = [makeBroadcastInput(target, "BROADCAST_INPUT", self.b)]
+        block.setInputs(makeBroadcastInput(target, "BROADCAST_INPUT", self.b))
 
         return [block]
 
@@ -513,7 +513,7 @@ class SPILProgram:
         varId = self.target.addVariable(name, str(value))
         self.variableIds[name] = varId
     
-    def createList(self, name, value=[]):
+    def createList(self, name, value=None):
         listId = self.target.addList(name, value)
         self.listIds[name] = listId
 
@@ -572,7 +572,7 @@ class SPILProgram:
 
         # add broadcast ids to stage
         for name, id in self.broadcastIds.items():
-            self.stage.broadcasts[id] = name
+            self.stage.addBroadcast(id, name)
 
         # add variables to target
         for varName in self.variables:
@@ -595,7 +595,7 @@ class SPILProgram:
             broadcastBlock.opcode = "event_whenbroadcastreceived"
             broadcastOpt = [broadcast.name,
                             self.getBroadcastId(broadcast.name)]
-            broadcastBlock.fields.append(
+            broadcastBlock.addField(
                 scratch.BlockField("BROADCAST_OPTION", broadcastOpt))
 
             # begin the chain
@@ -0,0 +1,20 @@
+"""
+Quick checks for the assembler's line parser. Run with "python -m core.test_assembler" from the repo root
+"""
+
+import time
+from core.assembler import Assembly
+
+def test_padded_line_parses_in_linear_time():
+    # a long run of spaces inside the arguments used to make the line regex backtrack quadratically
+    padding = " "*20000
+    start = time.perf_counter()
+    result = Assembly().parseLine("addiu $2,"+padding+"$3, 4"+padding+"# comment")
+    elapsed = time.perf_counter()-start
+
+    assert result == ("instruction", "addiu", ["$2", "$3", "4"]), result
+    assert elapsed < 0.1, f"parsing a padded line took {elapsed:.3f}s"
+
+if __name__ == "__main__":
+    test_padded_line_parses_in_linear_time()
+    print("ok")
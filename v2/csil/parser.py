@@ -6,41 +6,39 @@ from . import instructions
 
 class CSILParseError(Exception): pass
 
-def _isCharEnclosed(charIndex, string):
-    """ Return true if the character at charIndex is enclosed in double quotes (a string) """
-    numQuotes = 0  # if the number of quotes past this character is odd, than this character lies inside a string
-    for i in range(charIndex, len(string)):
-        if string[i] == '"':
-            numQuotes += 1
-
-    return numQuotes % 2 == 1
-
 def _removeComments(line):
     """ return [line] with any comments removed """
     if not "#" in line:
         return line
 
     # Find the first instance of a # character that isn't enclosed inside a string
+    inString = False
 
     for i, c in enumerate(line):
-        if c == "#":
-            if not _isCharEnclosed(i, line):
-                return line[:i]
+        if c == '"':
+            inString = not inString
+        elif c == "#" and not inString:
+            return line[:i]
+
+    return line
 
 def _split(string, delimiter):
     """ split [string] on any delimiters that aren't enclosed in strings. delimiter can only be one character """
-    segment = ""
     segments = []
+    segmentStart = 0
+    inString = False
 
+    # track whether we're inside a string as we go and slice out each segment,
+    # rather than building segments up one character at a time
     for i, c in enumerate(string):
-        if c == delimiter and not _isCharEnclosed(i, string):
-            segments.append(segment)
-            segment = ""
-        else:
-            segment += c
-
-    if segment:
-        segments.append(segment)
+        if c == '"':
+            inString = not inString
+        elif c == delimiter and not inString:
+            segments.append(string[segmentStart:i])
+            segmentStart = i+1
+
+    if segmentStart < len(string):
+        segments.append(string[segmentStart:])
 
     return segments
 
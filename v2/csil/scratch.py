@@ -5,7 +5,6 @@ A library for loading and manipluating Scratch project (sb3) files
 import zipfile
 import shutil
 from pathlib import Path
-from glob import glob
 import os
 import json
 import random
@@ -453,12 +452,12 @@ class ScratchProject:
         self.dir = dir
         self.deleteDir = True  # Whether to delete the working directory when __exit__ is called
         self.projectFile = projectFile
-        self.assets: list = []
-        for assetPath in glob(dir+"/*"):
-            if assetPath.endswith(".json"):  # Skip the project.json file
-                continue
-
-            self.assets.append(ScratchAsset(assetPath))
+        with os.scandir(dir) as entries:
+            # skip the project.json file
+            self.assets: list = [
+                ScratchAsset(entry.path) for entry in entries
+                if entry.is_file() and not entry.name.endswith(".json")
+            ]
 
         self._projectData = None  # JSON-parsed contents of the project.json file
         with open(dir+"/"+"project.json") as projectFile: